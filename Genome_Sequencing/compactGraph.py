@@ -0,0 +1,295 @@
+from collections.abc import Mapping
+import numpy as np
+
+_default_alphabet = 'ACGT'
+
+
+def _alphabetOf(data, alphabet=None):
+    """
+    :param data: uint8 array of the characters of all sequences.
+    :param alphabet: String of symbols in sort order, None to use ACGT or, failing that, the sorted symbols present.
+    :return: Tuple of (alphabet, bits per symbol, 256 entry lookup table from byte to symbol index).
+    """
+    if alphabet is None:
+        present = ''.join(chr(c) for c in np.flatnonzero(np.bincount(data, minlength=256)))
+        alphabet = _default_alphabet if set(present) <= set(_default_alphabet) else present
+    lookup = np.full(256, 255, dtype=np.uint8)
+    lookup[np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)] = np.arange(len(alphabet))
+    if len(data) and lookup[data].max() == 255:
+        raise ValueError(f'Sequence holds characters outside the alphabet {alphabet!r}.')
+    return alphabet, max(1, (len(alphabet) - 1).bit_length()), lookup
+
+
+def _packSymbols(symbols, bits):
+    """
+    Packs rows of symbol indices into integers, first symbol in the highest bits, so integer order is the
+    lexicographic order of the rows.
+
+    :param symbols: n x L array of symbol indices.
+    :param bits: Integer bits per symbol.
+    :return: uint64 array if a row fits in 64 bits, otherwise an array of void keys holding the
+             big-endian words of each row (still comparable and sortable).
+    """
+    n, length = symbols.shape
+    per = 64 // bits
+    words = np.zeros((n, max(1, -(-length // per))), dtype=np.uint64)
+    for j in range(length):
+        words[:, j // per] |= symbols[:, j].astype(np.uint64) << np.uint64(bits * (per - 1 - j % per))
+    if words.shape[1] == 1:
+        return words[:, 0]
+    return np.ascontiguousarray(words.astype('>u8')).view(f'V{8 * words.shape[1]}').ravel()
+
+
+def _unpackSymbols(keys, length, bits, first=0):
+    """
+    :param first: Integer index of the first symbol to unpack.
+    :return: len(keys) x (length - first) uint8 array of symbol indices, the inverse of _packSymbols.
+    """
+    per = 64 // bits
+    if keys.dtype == np.uint64:
+        words = keys[:, None]
+    else:
+        words = keys.view('>u8').reshape(len(keys), -1).astype(np.uint64)
+    symbols = np.empty((len(keys), length - first), dtype=np.uint8)
+    for j in range(first, length):
+        shifted = words[:, j // per] >> np.uint64(bits * (per - 1 - j % per))
+        symbols[:, j - first] = shifted & np.uint64((1 << bits) - 1)
+    return symbols
+
+
+class CompactGraph(Mapping):
+    """
+    De Bruijn graph with integer node IDs. Node labels are packed a few bits per symbol and kept sorted,
+    so a node's ID is its rank. Out-edges are stored CSR style: the targets of node i are
+    targets[offsets[i]:offsets[i + 1]], in the order the edges were given.
+
+    Read-only, it behaves like the dictionary of node -> list of nodes the other graph builders return,
+    holding only nodes with out-edges. Labels are (k-1)-mer strings, or tuples of two for paired graphs.
+    """
+
+    def __init__(self, nodes, offsets, targets, length, alphabet, bits, paired=False):
+        self.nodes = nodes
+        self.offsets = offsets
+        self.targets = targets
+        self.length = length
+        self.alphabet = alphabet
+        self.bits = bits
+        self.paired = paired
+        self._lookup = _alphabetOf(np.empty(0, dtype=np.uint8), alphabet)[2]
+
+    def __getitem__(self, label):
+        node = self.nodeId(label)
+        if node is None or self.offsets[node] == self.offsets[node + 1]:
+            raise KeyError(label)
+        return self.labels(self.successors(node))
+
+    def __iter__(self):
+        for node in np.flatnonzero(np.diff(self.offsets)):
+            yield self.label(node)
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.offsets)))
+
+    @property
+    def nodeCount(self):
+        return len(self.nodes)
+
+    @property
+    def edgeCount(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        """
+        :return: Integer bytes held by the node and edge arrays.
+        """
+        return self.nodes.nbytes + self.offsets.nbytes + self.targets.nbytes
+
+    def successors(self, node):
+        """
+        :param node: Integer node ID.
+        :return: Array of the target IDs of the node's out-edges.
+        """
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def outDegrees(self):
+        return np.diff(self.offsets).astype(np.int64)
+
+    def inDegrees(self):
+        return np.bincount(self.targets, minlength=self.nodeCount)
+
+    def nodeId(self, label):
+        """
+        :param label: Node label, string or tuple of two strings for paired graphs.
+        :return: Integer node ID, or None if label is not a node.
+        """
+        text = ''.join(label) if self.paired else label
+        if not isinstance(text, str) or len(text) != self.length:
+            return None
+        data = np.frombuffer(text.encode('ascii', 'replace'), dtype=np.uint8)
+        symbols = self._lookup[data]
+        if symbols.max(initial=0) == 255:
+            return None
+        key = _packSymbols(symbols[None, :], self.bits)
+        node = int(np.searchsorted(self.nodes, key)[0])
+        if node < self.nodeCount and self.nodes[node] == key[0]:
+            return node
+        return None
+
+    def labels(self, nodes):
+        """
+        Decodes many node IDs at once.
+
+        :param nodes: Array or list of integer node IDs.
+        :return: List of node labels.
+        """
+        symbols = _unpackSymbols(self.nodes[np.asarray(nodes, dtype=np.int64)], self.length, self.bits)
+        chars = np.frombuffer(self.alphabet.encode('ascii'), dtype=np.uint8)[symbols]
+        if not self.paired:
+            return [row.decode('ascii') for row in _rowBytes(chars)]
+        half = self.length // 2
+        return [(left.decode('ascii'), right.decode('ascii'))
+                for left, right in zip(_rowBytes(chars[:, :half]), _rowBytes(chars[:, half:]))]
+
+    def label(self, node):
+        return self.labels([node])[0]
+
+
+def _rowBytes(chars):
+    """
+    :param chars: n x L uint8 array of characters.
+    :return: List of n bytes objects, one per row.
+    """
+    if not chars.shape[1]:
+        return [b''] * len(chars)
+    return np.ascontiguousarray(chars).view(f'S{chars.shape[1]}').ravel().tolist()
+
+
+def _buildGraph(sources, destinations, length, alphabet, bits, paired=False):
+    """
+    Interns the packed source and destination labels of every edge and lays out the CSR arrays.
+    """
+    keys, ids = np.unique(np.concatenate([sources, destinations]), return_inverse=True)
+    ids = ids.ravel()
+    index = np.uint32 if len(keys) < 1 << 32 else np.int64
+    source_ids = ids[:len(sources)]
+    # Stable, so each adjacency list keeps the order the edges were given in.
+    order = np.argsort(source_ids, kind='stable')
+    targets = ids[len(sources):][order].astype(index)
+
+    counts = np.bincount(source_ids, minlength=len(keys))
+    offsets = np.zeros(len(keys) + 1, dtype=np.uint32 if len(targets) < 1 << 32 else np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return CompactGraph(keys, offsets, targets, length, alphabet, bits, paired)
+
+
+def _symbolMatrix(patterns, alphabet=None):
+    """
+    :param patterns: List of strings of equal length.
+    :return: Tuple of (len(patterns) x length array of symbol indices, alphabet, bits).
+    """
+    length = len(patterns[0]) if patterns else 0
+    if any(len(patt) != length for patt in patterns):
+        raise ValueError('All patterns must have the same length.')
+    data = np.frombuffer(''.join(patterns).encode('ascii', 'replace'), dtype=np.uint8)
+    alphabet, bits, lookup = _alphabetOf(data, alphabet)
+    return lookup[data].reshape(len(patterns), length), alphabet, bits
+
+
+def compactFromKmers(patterns, alphabet=None):
+    """
+    :param patterns: List containing k-mer patterns, each one an edge from its prefix to its suffix.
+    :param alphabet: String of symbols in sort order, None to use ACGT or the sorted symbols present.
+    :return: CompactGraph of the (k-1)-mers.
+    """
+    symbols, alphabet, bits = _symbolMatrix(patterns, alphabet)
+    length = max(symbols.shape[1] - 1, 0)
+    return _buildGraph(_packSymbols(symbols[:, :-1], bits), _packSymbols(symbols[:, 1:], bits),
+                       length, alphabet, bits)
+
+
+def compactFromText(text, k, alphabet=None):
+    """
+    :param text: String consisting of sequence.
+    :param k: Integer corresponding to size of k.
+    :param alphabet: String of symbols in sort order, None to use ACGT or the sorted symbols present.
+    :return: CompactGraph with an edge for every k-mer window of text.
+    """
+    data = np.frombuffer(text.encode('ascii', 'replace'), dtype=np.uint8)
+    alphabet, bits, lookup = _alphabetOf(data, alphabet)
+    if len(data) < k:
+        windows = np.zeros((0, k), dtype=np.uint8)
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(lookup[data], k)
+    return _buildGraph(_packSymbols(windows[:, :-1], bits), _packSymbols(windows[:, 1:], bits),
+                       k - 1, alphabet, bits)
+
+
+def compactFromCodes(codes, k):
+    """
+    :param codes: Array of 2-bit ACGT k-mer codes (A=0, C=1, G=2, T=3, last base in the lowest bits).
+    :param k: Integer for k-mer size, at most 32.
+    :return: CompactGraph with an edge for every code.
+    """
+    codes = np.asarray(codes, dtype=np.uint64)
+    # Node labels are packed from the highest bits down, so shift the (k-1)-mer codes to the top.
+    shift = np.uint64(64 - 2 * (k - 1))
+    mask = np.uint64((1 << (2 * (k - 1))) - 1)
+    return _buildGraph((codes >> np.uint64(2)) << shift, (codes & mask) << shift,
+                       k - 1, _default_alphabet, 2)
+
+
+def compactFromPairs(pairComp, alphabet=None):
+    """
+    :param pairComp: List of tuples containing pair compositions.
+    :param alphabet: String of symbols in sort order, None to use ACGT or the sorted symbols present.
+    :return: Paired CompactGraph, each node packing the prefixes (or suffixes) of both reads of a pair.
+    """
+    first, alphabet, bits = _symbolMatrix([pair[0] for pair in pairComp], alphabet)
+    second = _symbolMatrix([pair[1] for pair in pairComp], alphabet)[0]
+    if first.shape[1] != second.shape[1]:
+        raise ValueError('Both k-mers of a pair must have the same length.')
+    sources = np.concatenate([first[:, :-1], second[:, :-1]], axis=1)
+    destinations = np.concatenate([first[:, 1:], second[:, 1:]], axis=1)
+    return _buildGraph(_packSymbols(sources, bits), _packSymbols(destinations, bits),
+                       sources.shape[1], alphabet, bits, paired=True)
+
+
+def spellPath(graph, path):
+    """
+    Spells the string of a path of node IDs: the first label followed by the last symbol of every other node.
+
+    :param graph: Unpaired CompactGraph.
+    :param path: Array or list of integer node IDs, each an out-neighbour of the one before.
+    :return: String spelled by path.
+    """
+    path = np.asarray(path, dtype=np.int64)
+    if not len(path):
+        return ''
+    # Only the last symbol of each node after the first is needed.
+    last = _unpackSymbols(graph.nodes[path[1:]], graph.length, graph.bits, graph.length - 1)[:, 0]
+    chars = np.frombuffer(graph.alphabet.encode('ascii'), dtype=np.uint8)[last]
+    return graph.label(path[0]) + chars.tobytes().decode('ascii')
+
+
+def spellPaths(graph, paths):
+    """
+    Spells many paths at once, decoding the nodes of all of them in one pass.
+
+    :param graph: Unpaired CompactGraph.
+    :param paths: List of paths, each a list of integer node IDs.
+    :return: List of the strings spelled by paths.
+    """
+    if not paths:
+        return []
+    firsts = graph.labels([path[0] for path in paths])
+    rest = np.fromiter((node for path in paths for node in path[1:]), dtype=np.int64)
+    last = _unpackSymbols(graph.nodes[rest], graph.length, graph.bits, graph.length - 1)[:, 0]
+    spelled = np.frombuffer(graph.alphabet.encode('ascii'), dtype=np.uint8)[last].tobytes().decode('ascii')
+
+    result = []
+    position = 0
+    for first, path in zip(firsts, paths):
+        result.append(first + spelled[position:position + len(path) - 1])
+        position += len(path) - 1
+    return result
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from compactGraph import CompactGraph, spellPaths
+from stringComposition import stringSpelled
+
+
+def _adjacency(graph):
+    """
+    Interns the nodes of a graph as integer IDs.
+
+    :param graph: Dictionary of node -> list of nodes, or CompactGraph.
+    :return: Tuple of (list of node labels or None for a CompactGraph, offsets list, targets list).
+    """
+    if isinstance(graph, CompactGraph):
+        return None, graph.offsets.tolist(), graph.targets.tolist()
+
+    ids = {node: i for i, node in enumerate(graph)}
+    offsets = [0]
+    targets = []
+    for node in list(ids):
+        for target in graph[node]:
+            if target not in ids:
+                ids[target] = len(ids)
+            targets.append(ids[target])
+        offsets.append(len(targets))
+    # Nodes that are only ever targets have no out-edges.
+    offsets.extend([len(targets)] * (len(ids) - len(offsets) + 1))
+    return list(ids), offsets, targets
+
+
+def _nonBranchingPaths(offsets, targets):
+    """
+    Finds every maximal non-branching path in one pass over the edges. Paths start at each out-edge of a
+    node that is not 1-in-1-out and run through 1-in-1-out nodes; 1-in-1-out nodes left over afterwards
+    lie on isolated cycles.
+
+    :param offsets: List of CSR offsets, node i having targets[offsets[i]:offsets[i + 1]].
+    :param targets: List of CSR targets.
+    :return: List of paths, each a list of integer node IDs.
+    """
+    n = len(offsets) - 1
+    indegree = [0] * n
+    for target in targets:
+        indegree[target] += 1
+    # Only 1-in-1-out nodes can be passed through.
+    through = [indegree[i] == 1 and offsets[i + 1] - offsets[i] == 1 for i in range(n)]
+    used = bytearray(n)
+
+    paths = []
+    for node in range(n):
+        if through[node]:
+            continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            path = [node]
+            target = targets[edge]
+            while through[target]:
+                used[target] = 1
+                path.append(target)
+                target = targets[offsets[target]]
+            path.append(target)
+            paths.append(path)
+
+    for node in range(n):
+        if through[node] and not used[node]:
+            path = [node]
+            used[node] = 1
+            target = targets[offsets[node]]
+            while target != node:
+                used[target] = 1
+                path.append(target)
+                target = targets[offsets[target]]
+            path.append(node)
+            paths.append(path)
+    return paths
+
+
+def maximalNonBranchingPaths(graph):
+    """
+    :param graph: Directed adjacency list as dictionary, or CompactGraph.
+    :return: List of maximal non-branching paths, each a list of nodes. Isolated cycles start and end on the
+             same node.
+    """
+    labels, offsets, targets = _adjacency(graph)
+    paths = _nonBranchingPaths(offsets, targets)
+    if labels is None:
+        return [graph.labels(path) for path in paths]
+    return [[labels[node] for node in path] for path in paths]
+
+
+def _spellPaths(graph, labels, paths):
+    if labels is None:
+        return spellPaths(graph, paths)
+    return [stringSpelled([labels[node] for node in path]) for path in paths]
+
+
+def contigGeneration(graph):
+    """
+    Assembles the contigs of a de Bruijn graph: the strings spelled by its maximal non-branching paths.
+
+    :param graph: deBruijn graph as dictionary of (k-1)-mer -> list of (k-1)-mers, or CompactGraph.
+    :return: List of contig strings.
+    """
+    labels, offsets, targets = _adjacency(graph)
+    return _spellPaths(graph, labels, _nonBranchingPaths(offsets, targets))
+
+
+def compactedGraph(graph):
+    """
+    Collapses every maximal non-branching path of a de Bruijn graph into a single contig (unitig). Contig i
+    leads to contig j when i ends on the (k-1)-mer that j starts from.
+
+    :param graph: deBruijn graph as dictionary of (k-1)-mer -> list of (k-1)-mers, or CompactGraph.
+    :return: Tuple of (compacted graph as dictionary of contig index -> list of contig indices, list of
+             contig strings).
+    """
+    labels, offsets, targets = _adjacency(graph)
+    paths = _nonBranchingPaths(offsets, targets)
+
+    starting = defaultdict(list)
+    for i, path in enumerate(paths):
+        starting[path[0]].append(i)
+    compacted = {i: list(starting.get(path[-1], [])) for i, path in enumerate(paths)}
+    return compacted, _spellPaths(graph, labels, paths)
@@ -1,5 +1,12 @@
 import re
 import random
+import itertools
+from collections import Counter
+import numpy as np
+from compactGraph import CompactGraph
+
+# Returned by a node cursor once all of its out-edges are used.
+_no_edge = object()
 
 
 def getInput(file, mode=None):
@@ -24,132 +31,158 @@ def getInput(file, mode=None):
         Exception('Please specify a mode!')
 
 
-def eulerianCycle(graph):
+def degreeBalance(graph):
     """
-    Finds the cycle through a graph where each in and out edge or 'bridge' is used only once.
+    Computes out-degree minus in-degree of every node in one pass over the edges.
 
-    :param graph: Directed adjacency list of Eulerian graph as dictionary.
-    :return: List in order representing Eulerian path
+    :param graph: Directed adjacency list as dictionary of node -> list of nodes.
+    :return: Dictionary of node -> out-degree minus in-degree, for the nodes where it is not zero.
     """
-    # Initialize empty stack, circuit and in/out lists.
-    stack = []
-    circuit = []
-    in_edges = []
-    out_edges = []
+    balance = Counter({node: len(targets) for node, targets in graph.items()})
+    balance.subtract(itertools.chain.from_iterable(graph.values()))
+    return {node: value for node, value in balance.items() if value}
 
-    # Obtain length count of all values in graph dictionary and list version of keys.
-    values = graph.values()
-    count = sum(len(value) for value in values)
-    listed_keys = list(graph.keys())
 
-    # Populate individual check lists.
-    for x in graph.keys():
-        out_edges.append(len(graph.get(x)))
-        in_edges.append(sum(v == x for value in values for v in value))
+def _edgeOrder(graph, seed):
+    """
+    :param seed: None to follow the adjacency lists in order, or an integer seed / random.Random to shuffle them.
+    :return: Tuple of (adjacency dictionary to walk, random generator or None).
+    """
+    if seed is None:
+        return graph, None
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+    # Shuffled copies, the caller's lists are left as they are.
+    return {node: rng.sample(targets, len(targets)) for node, targets in graph.items()}, rng
 
-    # Populate compared check list.
-    check = [x-y for x, y in zip(out_edges, in_edges)]
 
-    # Check if Eulerian path is available and select starting location based on in-out edges.
-    if in_edges == out_edges:
-        location = random.choice(listed_keys)
-        print('All in and out edges of vectors are equal.')
+def _hierholzer(graph, start):
+    """
+    Iterative Hierholzer walk. Every node keeps an iterator over its out-edges as a cursor to the next
+    unused one, so each edge is followed once and nothing is removed from the graph.
 
-    elif sorted(set(check)) == [-1, 0, 1]:
-        location = listed_keys[check.index(1)]
-        print('All but two vectors in and out edges are equal')
+    :param graph: Directed adjacency list as dictionary.
+    :param start: Node the walk starts from.
+    :return: List of nodes in Eulerian order.
+    """
+    cursors = {node: iter(targets) for node, targets in graph.items()}
+    done = iter(())
+    stack = [start]
+    circuit = []
+    while stack:
+        target = next(cursors.get(stack[-1], done), _no_edge)
+        if target is _no_edge:
+            circuit.append(stack.pop())
+        else:
+            stack.append(target)
+    circuit.reverse()
+    return circuit
 
-    else:
-        raise ValueError('No Eulerian path available in this graph!')
 
-    # While loop until length of circuit is of equal length to total length of values in graph.values()
-    while len(circuit) != count:
-        # Current key iteration
-        key = graph.get(location)
+def _checkWalk(graph, circuit):
+    """
+    Raises ValueError if the walk missed edges, which happens exactly when the edges are not connected.
+    """
+    if len(circuit) != sum(len(targets) for targets in graph.values()) + 1:
+        raise ValueError('No Eulerian path available in this graph, its edges are not connected!')
+    return circuit
 
-        # Runs if key is empty.
-        if not key:
-            circuit.append(location)
-            location = stack.pop()
 
-        # Runs if it reaches a key-node that still has out-edges left.
-        if key:
-            # Append location to stack
-            stack.append(location)
-            # Select index and pop out of key-value list element.
-            index = random.randint(0, len(key) - 1)
-            select = key.pop(index)
-            # Reset location to selection
-            location = select
+def eulerianCycle(graph, seed=None):
+    """
+    Finds the cycle through a graph where each in and out edge or 'bridge' is used only once.
+    Runs in O(E) and leaves graph unchanged.
 
-    # Finalise circuit loop!
-    circuit.append(circuit[0])
+    :param graph: Directed adjacency list of Eulerian graph as dictionary.
+    :param seed: None for a deterministic cycle following the adjacency lists in order (starting at the first
+                 node), or an integer seed / random.Random to start at a random node and take edges in random order.
+    :return: List in order representing Eulerian cycle, first and last node being the same.
+    """
+    if isinstance(graph, CompactGraph):
+        return graph.labels(eulerianPathIds(graph, seed, cycle=True))
+    if degreeBalance(graph):
+        raise ValueError('No Eulerian cycle available in this graph, in and out edges differ!')
+    nodes = [node for node, targets in graph.items() if targets]
+    if not nodes:
+        raise ValueError('No Eulerian cycle available in a graph without edges!')
 
-    # Return reversed circuit for correct order.
-    return circuit[::-1]
+    walk, rng = _edgeOrder(graph, seed)
+    start = rng.choice(nodes) if rng else nodes[0]
+    return _checkWalk(graph, _hierholzer(walk, start))
 
 
-def eulerianPath(graph):
+def eulerianPath(graph, seed=None):
     """
     Finds the path through a graph where each in and out edge or 'bridge' is used only once.
+    Balanced graphs give a cycle. Runs in O(E) and leaves graph unchanged.
 
     :param graph: Directed adjacency list of Eulerian graph as dictionary.
+    :param seed: None for a deterministic path following the adjacency lists in order, or an integer seed /
+                 random.Random to take edges in random order.
     :return: List in order representing Eulerian path
     """
-    # Initialize empty stack, circuit and in/out lists.
-    stack = []
-    circuit = []
-    in_edges = []
-    out_edges = []
-
-    # Obtain length count of all values in graph dictionary and list version of keys.
-    values = graph.values()
-    count = sum(len(value) for value in values)
-    listed_keys = list(graph.keys())
-
-    # Populate individual check lists.
-    for x in graph.keys():
-        out_edges.append(len(graph.get(x)))
-        in_edges.append(sum(v == x for value in values for v in value))
-
-    # Populate compared check list.
-    check = [x-y for x, y in zip(out_edges, in_edges)]
-
-    # Check if Eulerian path is available and select starting location based on in-out edges.
-    if in_edges == out_edges:
-        location = random.choice(listed_keys)
-        print('All in and out edges of vectors are equal.')
-
-    elif sorted(set(check)) == [0, 1] or sorted(set(check)) == [-1, 0, 1]:
-        location = listed_keys[check.index(1)]
-        print('All but two vectors in and out edges are equal')
-
-    else:
+    if isinstance(graph, CompactGraph):
+        return graph.labels(eulerianPathIds(graph, seed))
+    balance = degreeBalance(graph)
+    if not balance:
+        return eulerianCycle(graph, seed)
+
+    starts = [node for node, value in balance.items() if value == 1]
+    ends = [node for node, value in balance.items() if value == -1]
+    if len(starts) != 1 or len(ends) != 1 or len(balance) != 2:
         raise ValueError('No Eulerian path available in this graph!')
 
-    # While loop until length of circuit is of equal length to total length of values in graph.values()
-    while len(circuit) != count:
-        # Current key iteration
-        key = graph.get(location)
+    walk, rng = _edgeOrder(graph, seed)
+    return _checkWalk(graph, _hierholzer(walk, starts[0]))
 
-        # Runs if key is empty.
-        if not key:
-            circuit.append(location)
-            location = stack.pop()
 
-        # Runs if it reaches a key-node that still has out-edges left.
-        if key:
-            # Append location to stack
-            stack.append(location)
-            # Select index and pop out of key-value list element.
-            index = random.randint(0, len(key) - 1)
-            select = key.pop(index)
-            # Reset location to selection
-            location = select
-
-    # Finalise circuit path.
-    circuit.append(location)
+def eulerianPathIds(graph, seed=None, cycle=False):
+    """
+    Eulerian path over the integer node IDs of a CompactGraph, using its offset array as the edge cursors.
 
-    # Return reversed circuit for correct order.
-    return circuit[::-1]
+    :param graph: CompactGraph.
+    :param seed: None to follow the edges in order, or an integer seed / random.Random to take them in random order.
+    :param cycle: If True, require a cycle.
+    :return: int64 array of node IDs in Eulerian order.
+    """
+    balance = graph.outDegrees() - graph.inDegrees()
+    starts = np.flatnonzero(balance == 1)
+    ends = np.flatnonzero(balance == -1)
+    unbalanced = np.count_nonzero(balance)
+    if unbalanced and cycle:
+        raise ValueError('No Eulerian cycle available in this graph, in and out edges differ!')
+    if unbalanced and (len(starts) != 1 or len(ends) != 1 or unbalanced != 2):
+        raise ValueError('No Eulerian path available in this graph!')
+    if not graph.edgeCount:
+        raise ValueError('No Eulerian cycle available in a graph without edges!')
+
+    targets = graph.targets
+    rng = None
+    if seed is not None:
+        rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+        # Shuffle the edges within each node's block by sorting on (source, random key).
+        sources = np.repeat(np.arange(graph.nodeCount), graph.outDegrees())
+        keys = np.random.default_rng(rng.getrandbits(64)).random(graph.edgeCount)
+        targets = targets[np.lexsort((keys, sources))]
+
+    if len(starts):
+        start = int(starts[0])
+    else:
+        nodes = np.flatnonzero(graph.outDegrees())
+        start = int(nodes[rng.randrange(len(nodes))]) if rng else int(nodes[0])
 
+    targets = targets.tolist()
+    cursor = graph.offsets[:-1].tolist()
+    end = graph.offsets[1:].tolist()
+    stack = [start]
+    circuit = []
+    while stack:
+        node = stack[-1]
+        position = cursor[node]
+        if position < end[node]:
+            cursor[node] = position + 1
+            stack.append(targets[position])
+        else:
+            circuit.append(stack.pop())
+    if len(circuit) != graph.edgeCount + 1:
+        raise ValueError('No Eulerian path available in this graph, its edges are not connected!')
+    return np.array(circuit[::-1], dtype=np.int64)
@@ -1,5 +1,6 @@
 from collections import defaultdict
-import random
+from eulerian import eulerianPath
+from compactGraph import compactFromPairs
 
 def getInput(file):
     """
@@ -74,12 +75,16 @@ def stringSpelledPair(pathPairPatterns, k, d):
     return prefixString + suffixString[-k-d:]
 
 
-def deBruijnFromPairs(pairComp):
+def deBruijnFromPairs(pairComp, mode=None):
     """
 
     :param pairComp: List of tuples containing pair compositions.
+    :param mode: 'compact' to return a CompactGraph, dictionary otherwise (default).
     :return: deBruijin graph of text and k-mer in adjacency list form.
     """
+    if mode in ['compact']:
+        return compactFromPairs(pairComp)
+
     result = defaultdict(list)
     prefix = [(pair[0][:-1], pair[1][:-1]) for pair in pairComp]
     suffix = [(pair[0][1:], pair[1][1:]) for pair in pairComp]
@@ -91,81 +96,17 @@ def deBruijnFromPairs(pairComp):
     return result
 
 
-def eulerianPath(graph):
-    """
-    Finds the path through a graph where each in and out edge or 'bridge' is used only once.
-
-    :param graph: Directed adjacency list of Eulerian graph as dictionary.
-    :return: List in order representing Eulerian path
-    """
-    # Initialize empty stack, circuit and in/out lists.
-    stack = []
-    circuit = []
-    in_edges = []
-    out_edges = []
-
-    # Obtain length count of all values in graph dictionary and list version of keys.
-    values = graph.values()
-    count = sum(len(value) for value in values)
-    listed_keys = list(graph.keys())
-
-    # Populate individual check lists.
-    for x in graph.keys():
-        out_edges.append(len(graph.get(x)))
-        in_edges.append(sum(v == x for value in values for v in value))
-
-    # Populate compared check list.
-    check = [x - y for x, y in zip(out_edges, in_edges)]
-
-    # Check if Eulerian path is available and select starting location based on in-out edges.
-    if in_edges == out_edges:
-        location = random.choice(listed_keys)
-        print('All in and out edges of vectors are equal.')
-
-    elif sorted(set(check)) == [0, 1] or sorted(set(check)) == [-1, 0, 1]:
-        location = listed_keys[check.index(1)]
-        print('All but two vectors in and out edges are equal')
-
-    else:
-        raise ValueError('No Eulerian path available in this graph!')
-
-    # While loop until length of circuit is of equal length to total length of values in graph.values()
-    while len(circuit) != count:
-        # Current key iteration
-        key = graph.get(location)
-
-        # Runs if key is empty.
-        if not key:
-            circuit.append(location)
-            location = stack.pop()
-
-        # Runs if it reaches a key-node that still has out-edges left.
-        if key:
-            # Append location to stack
-            stack.append(location)
-            # Select index and pop out of key-value list element.
-            index = random.randint(0, len(key) - 1)
-            select = key.pop(index)
-            # Reset location to selection
-            location = select
-
-    # Finalise circuit path.
-    circuit.append(location)
-
-    # Return reversed circuit for correct order.
-    return circuit[::-1]
-
-
-def stringReconstructFromPairs(pairs, k, d):
+def stringReconstructFromPairs(pairs, k, d, mode=None):
     """
     Uses several of the above functions to obtain the eulerian string constructions from read pairs.
 
     :param pairs: List of tuples consiting of pairs
     :param k: Int of k-mer size.
     :param d: Int of distance between k-mers.
+    :param mode: 'compact' to build the graph as a CompactGraph.
     :return: String of constructed sequence.
     """
-    dB = deBruijnFromPairs(pairs)
+    dB = deBruijnFromPairs(pairs, mode)
     path = eulerianPath(dB)
     result = stringSpelledPair(path, k, d)
     return result
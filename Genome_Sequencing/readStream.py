@@ -0,0 +1,210 @@
+import gzip
+import numpy as np
+from stringComposition import deBruijnFromKmers
+from compactGraph import compactFromCodes
+
+_nucleo = 'ACGT'
+
+# Byte value -> base index. Anything other than A, C, G, T (either case) maps to 4 and breaks k-mers.
+_base_index = np.full(256, 4, dtype=np.uint8)
+_base_index[np.frombuffer(b'ACGT', dtype=np.uint8)] = np.arange(4)
+_base_index[np.frombuffer(b'acgt', dtype=np.uint8)] = np.arange(4)
+
+
+def streamReads(file):
+    """
+    Streams the sequences of a FASTQ or FASTA file (gzipped if the name ends in .gz), one read at a time.
+    The format is taken from the first character: '@' for FASTQ, '>' for FASTA.
+
+    :param file: string with file name.
+    :return: Generator of read sequences as strings.
+    """
+    f = gzip.open(file, "rt") if file.endswith('.gz') else open(file, "r")
+    try:
+        header = f.readline()
+        if header.startswith('@'):
+            # Four lines per record: header, sequence, '+' separator and qualities.
+            while header:
+                yield f.readline().strip()
+                f.readline()
+                f.readline()
+                header = f.readline()
+
+        elif header.startswith('>'):
+            parts = []
+            for line in f:
+                if line.startswith('>'):
+                    yield ''.join(parts)
+                    parts = []
+                else:
+                    parts.append(line.strip())
+            yield ''.join(parts)
+
+        elif header:
+            raise ValueError(f'{file!r} is neither FASTQ nor FASTA.')
+    finally:
+        f.close()
+
+
+def _batchCodes(reads, k, canonical=False):
+    """
+    :param reads: List of read strings.
+    :param k: Integer for k-mer size, at most 32.
+    :param canonical: If True, return canonical codes.
+    :return: uint64 array with the 2-bit code of every k-mer window free of non-ACGT characters.
+    """
+    # Reads are joined with a separator so no window spans two reads.
+    symbols = _base_index[np.frombuffer('N'.join(reads).encode('ascii', 'replace'), dtype=np.uint8)]
+    if len(symbols) < k:
+        return np.empty(0, dtype=np.uint64)
+    bad = np.concatenate([[0], np.cumsum(symbols == 4)])
+    windows = np.lib.stride_tricks.sliding_window_view(symbols, k)
+    valid = bad[k:] == bad[:-k]
+
+    codes = np.zeros(len(windows), dtype=np.uint64)
+    for j in range(k):
+        codes = (codes << np.uint64(2)) | (windows[:, j] & 3).astype(np.uint64)
+    if canonical:
+        return canonicalCodes(codes[valid], k)
+    return codes[valid]
+
+
+def reverseComplementCodes(codes, k):
+    """
+    Vectorized reverse complement, each 2-bit field is complemented (XOR 3) and the fields are reversed.
+
+    :param codes: uint64 array of 2-bit k-mer codes.
+    :param k: Integer for k-mer size, at most 32.
+    :return: uint64 array of the reverse complement codes, in the same order.
+    """
+    codes = codes ^ np.uint64((1 << (2 * k)) - 1)
+    result = np.zeros_like(codes)
+    for i in range(k):
+        result = (result << np.uint64(2)) | (codes & np.uint64(3))
+        codes = codes >> np.uint64(2)
+    return result
+
+
+def canonicalCodes(codes, k):
+    """
+    :param codes: uint64 array of 2-bit k-mer codes.
+    :param k: Integer for k-mer size, at most 32.
+    :return: uint64 array holding the smaller of each code and its reverse complement.
+    """
+    return np.minimum(codes, reverseComplementCodes(codes, k))
+
+
+def _mergeCounts(codes, counts, batch):
+    """
+    Merges the k-mers of a batch into the sorted (codes, counts) table in one linear pass over the table:
+    k-mers already present have their counts added in place, new ones are inserted at their sorted position.
+    """
+    batch_codes, batch_counts = np.unique(batch, return_counts=True)
+    batch_counts = batch_counts.astype(np.uint32)
+    positions = np.searchsorted(codes, batch_codes)
+    found = positions < len(codes)
+    found[found] = codes[positions[found]] == batch_codes[found]
+
+    counts[positions[found]] += batch_counts[found]
+    new = ~found
+    return np.insert(codes, positions[new], batch_codes[new]), np.insert(counts, positions[new], batch_counts[new])
+
+
+def countReadKmers(reads, k, batchSize=1 << 22, canonical=False):
+    """
+    Counts the k-mers of a stream of reads into a compact table of sorted 2-bit codes and counts. Reads are
+    taken a batch at a time, so memory follows the number of distinct k-mers rather than the read volume.
+    Windows holding non-ACGT characters (e.g. N) are skipped.
+
+    Without canonical, k-mers are counted on the strand of the read, so the input must be stranded: reads
+    from the reverse strand would split each genomic k-mer's coverage between two codes. Unstranded runs
+    need canonical=True, which counts every k-mer together with its reverse complement.
+
+    :param reads: Iterable of read strings, e.g. from streamReads.
+    :param k: Integer for k-mer size, at most 32.
+    :param batchSize: Integer, approximate number of bases per batch.
+    :param canonical: If True, count the canonical code, min(code, reverse complement code).
+    :return: Tuple of (sorted uint64 array of k-mer codes, uint32 array of their counts).
+    """
+    if not 0 < k <= 32:
+        raise ValueError('k must be between 1 and 32.')
+    codes = np.empty(0, dtype=np.uint64)
+    counts = np.empty(0, dtype=np.uint32)
+    batch = []
+    size = 0
+    for read in reads:
+        batch.append(read)
+        size += len(read)
+        if size >= batchSize:
+            codes, counts = _mergeCounts(codes, counts, _batchCodes(batch, k, canonical))
+            batch = []
+            size = 0
+    if batch:
+        codes, counts = _mergeCounts(codes, counts, _batchCodes(batch, k, canonical))
+    return codes, counts
+
+
+def solidThreshold(counts, default=2):
+    """
+    Picks the coverage threshold at the first valley of the k-mer count histogram: error k-mers pile up
+    at low counts, genuine ones around the coverage peak.
+
+    :param counts: Array of k-mer counts from countReadKmers.
+    :param default: Integer returned when the histogram has no valley.
+    :return: Integer minimum count of a solid k-mer.
+    """
+    histogram = np.bincount(counts)
+    for count in range(2, len(histogram) - 1):
+        if histogram[count] <= histogram[count + 1]:
+            return count
+    return default
+
+
+def solidKmers(codes, counts, threshold=2):
+    """
+    :param codes: Array of k-mer codes from countReadKmers.
+    :param counts: Array of their counts.
+    :param threshold: Integer minimum count for a k-mer to be kept as solid.
+    :return: Array of the codes of solid k-mers.
+    """
+    return codes[counts >= threshold]
+
+
+def decodeKmers(codes, k):
+    """
+    :param codes: Array of 2-bit k-mer codes.
+    :param k: Integer for k-mer size.
+    :return: List of k-mer strings.
+    """
+    symbols = np.empty((len(codes), k), dtype=np.uint8)
+    for j in range(k):
+        symbols[:, k - 1 - j] = (codes >> np.uint64(2 * j)) & np.uint64(3)
+    chars = np.frombuffer(_nucleo.encode('ascii'), dtype=np.uint8)[symbols]
+    return [row.decode('ascii') for row in np.ascontiguousarray(chars).view(f'S{k}').ravel().tolist()] if k else []
+
+
+def deBruijnFromReads(file, k, threshold=2, mode=None, canonical=False):
+    """
+    Streams the reads of a FASTQ/FASTA file, counts their k-mers and builds the de Bruijn graph of the solid
+    ones. Every solid k-mer gives one edge; k-mers seen fewer than threshold times are taken as read errors.
+    Without canonical the reads must be stranded, see countReadKmers.
+
+    :param file: string with file name.
+    :param k: Integer for k-mer size, at most 32.
+    :param threshold: Integer minimum count for a k-mer to be solid, or 'auto' to use solidThreshold.
+    :param mode: 'compact' to return a CompactGraph, dictionary otherwise (default).
+    :param canonical: If True, count k-mers and their reverse complements together and give every solid
+                      k-mer an edge in both orientations.
+    :return: deBruijn graph of the solid k-mers in adjacency list form.
+    """
+    codes, counts = countReadKmers(streamReads(file), k, canonical=canonical)
+    if threshold in ['auto']:
+        threshold = solidThreshold(counts)
+    solid = solidKmers(codes, counts, threshold)
+    if canonical:
+        # Both strands of the genome; palindromic k-mers are their own reverse complement and appear once.
+        solid = np.unique(np.concatenate([solid, reverseComplementCodes(solid, k)]))
+
+    if mode in ['compact']:
+        return compactFromCodes(solid, k)
+    return deBruijnFromKmers(decodeKmers(solid, k))
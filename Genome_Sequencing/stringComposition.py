@@ -1,4 +1,5 @@
 from collections import defaultdict
+from compactGraph import compactFromText, compactFromKmers
 
 def getInput(file, mode=None):
     """
@@ -57,24 +58,36 @@ def stringSpelled(patterns):
     return genome
 
 
-def overlapGraph(patterns, mode=None):
+def overlapGraph(patterns, mode=None, output=None):
     '''
+    Patterns are indexed by their prefix in one pass, each suffix then finds its overlaps by lookup.
 
     :param patterns: List containing collection of patters of K-mers.
+    :param mode: Print friendly format ('print') or dictionary (default).
+    :param output: string with file name. If given, adjacency lines are streamed to the file as they are
+                   found instead of being collected.
     :return: Overlapping graph. Mode sets return to dictionary or print friendly format.
     '''
+    # Prefix -> distinct patterns starting with it, in order of first appearance.
+    prefixes = defaultdict(dict)
+    for patt in patterns:
+        prefixes[patt[:-1]][patt] = None
+
+    if output is not None:
+        f = open(output, "w")
+        for patt in dict.fromkeys(patterns):
+            matches = prefixes.get(patt[1:])
+            if matches:
+                f.write(patt + ' -> ' + ', '.join(matches) + '\n')
+        f.close()
+        return
 
     results = {}
-    prefix_lst = [patt[:-1] for patt in patterns]
-
     for patt in patterns:
-        suffix = patt[1:]
-        # If suffix of pattern matches anything in prefix_lst, return list of indexes.
-        indices = [i for i, prefix in enumerate(prefix_lst) if prefix == suffix]
-
-        # If indices is not empty, create key and value list with no repeats.
-        if indices:
-            results[patt] = set([patterns[i] for i in indices])
+        matches = prefixes.get(patt[1:])
+        # If suffix of pattern matches any prefix, create key and value set with no repeats.
+        if matches:
+            results[patt] = set(matches)
 
     # Return a print-friendly or dictionary format.
     if mode in ['Print', 'print']:
@@ -90,9 +103,13 @@ def deBruijn(text, k, mode=None):
 
     :param text: Sting consisting of sequence
     :param k: Integer corresponding to size of k
-    :param mode: Decide to print values in graph format or return dictionary (default).
+    :param mode: Decide to print values in graph format, return a CompactGraph ('compact') or return
+                 dictionary (default).
     :return: deBruijin graph of text and k-mer in adjacency list form.
     '''
+    if mode in ['compact']:
+        return compactFromText(text, k)
+
     result = defaultdict(list)
     edges = [text[i:i+k] for i in range(len(text)-k+1)]
     nodes = [(edge[:-1], edge[1:]) for edge in edges]
@@ -113,9 +130,13 @@ def deBruijnFromKmers(patterns, mode=None):
     '''
 
     :param patterns: List containing k-mer patterns.
-    :param mode: Decide to print values in graph format or return dictionary (default).
+    :param mode: Decide to print values in graph format, return a CompactGraph ('compact') or return
+                 dictionary (default).
     :return: deBruijin graph of text and k-mer in adjacency list form.
     '''
+    if mode in ['compact']:
+        return compactFromKmers(patterns)
+
     result = defaultdict(list)
     nodes = [(edge[:-1], edge[1:]) for edge in patterns]
 
@@ -0,0 +1,111 @@
+from collections import deque
+
+
+def buildAutomaton(patterns):
+    """
+    Builds an Aho-Corasick automaton so that many patterns can be searched in a single pass.
+
+    :param patterns: List of pattern strings. Duplicates and empty strings are ignored.
+    :return: Dictionary with 'goto' (list of dicts char -> state), 'fail' (list of fallback states) and
+             'out' (list of patterns ending at each state, including those reached through fail links).
+    """
+    goto = [{}]
+    fail = [0]
+    out = [[]]
+
+    # Build the trie of all patterns.
+    for patt in dict.fromkeys(patterns):
+        if not patt:
+            continue
+        node = 0
+        for char in patt:
+            child = goto[node].get(char)
+            if child is None:
+                child = len(goto)
+                goto[node][char] = child
+                goto.append({})
+                fail.append(0)
+                out.append([])
+            node = child
+        out[node].append(patt)
+
+    # Breadth-first pass sets the fail link of every state to its longest proper suffix in the trie.
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for char, child in goto[node].items():
+            queue.append(child)
+            state = fail[node]
+            while state and char not in goto[state]:
+                state = fail[state]
+            target = goto[state].get(char, 0)
+            fail[child] = target if target != child else 0
+            out[child] = out[child] + out[fail[child]]
+
+    return {'goto': goto, 'fail': fail, 'out': out}
+
+
+def streamSearch(automaton, chunks):
+    """
+    Reports every occurrence of every pattern of the automaton in chunked input. The automaton state
+    is carried from one chunk to the next, so matches spanning chunk boundaries are found.
+
+    :param automaton: Dictionary produced by buildAutomaton.
+    :param chunks: Iterable of strings that together make up the sequence.
+    :return: Generator of (position, pattern) tuples, position being the 0-based start in the whole sequence.
+    """
+    goto = automaton['goto']
+    fail = automaton['fail']
+    out = automaton['out']
+    state = 0
+    offset = 0
+
+    for chunk in chunks:
+        for i, char in enumerate(chunk):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                end = offset + i + 1
+                for patt in out[state]:
+                    yield end - len(patt), patt
+        offset += len(chunk)
+
+
+def searchAutomaton(automaton, seq):
+    """
+    :param automaton: Dictionary produced by buildAutomaton.
+    :param seq: String to search.
+    :return: Generator of (position, pattern) tuples in order of match end.
+    """
+    return streamSearch(automaton, [seq])
+
+
+def multiPattPos(seq, patterns):
+    """
+    Finds the positions of all patterns in one pass over seq.
+
+    :param seq: String to search.
+    :param patterns: List of pattern strings.
+    :return: Dictionary of pattern -> sorted list of 0-based start positions.
+    """
+    result = {patt: [] for patt in patterns}
+    for position, patt in searchAutomaton(buildAutomaton(patterns), seq):
+        result[patt].append(position)
+    for positions in result.values():
+        positions.sort()
+    return result
+
+
+def multiPattCount(seq, patterns):
+    """
+    Counts the (overlapping) occurrences of all patterns in one pass over seq.
+
+    :param seq: String to search.
+    :param patterns: List of pattern strings.
+    :return: Dictionary of pattern -> integer count.
+    """
+    result = {patt: 0 for patt in patterns}
+    for position, patt in searchAutomaton(buildAutomaton(patterns), seq):
+        result[patt] += 1
+    return result
@@ -0,0 +1,155 @@
+def buildMatcher(patterns, d):
+    """
+    Prepares a bit-parallel (Shift-Add) matcher for Hamming distance <= d. Every pattern character gets
+    a field of B bits in one large integer; the low B - 1 bits count mismatches and the top bit flags an
+    overflow. All patterns share the same integer, so one pass over the text serves every pattern.
+
+    :param patterns: List of pattern strings.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Dictionary holding the matcher state tables.
+    """
+    d = int(d)
+    width = d.bit_length() + 1
+    field = (1 << width) - 1
+    overflow = 1 << (width - 1)
+
+    tables = {char: 0 for char in 'ACGT'}
+    ones = 0
+    starts = 0
+    end_low = 0
+    end_high = 0
+    end_bias = 0
+    ends = {}
+
+    offset = 0
+    for patt in dict.fromkeys(patterns):
+        if not patt:
+            continue
+        for j, char in enumerate(patt):
+            shift = (offset + j) * width
+            ones |= 1 << shift
+            for base in tables:
+                if base != char:
+                    tables[base] |= 1 << shift
+        starts |= field << (offset * width)
+
+        # Last field of the pattern holds the mismatch count of a full alignment.
+        shift = (offset + len(patt) - 1) * width
+        end_low |= (overflow - 1) << shift
+        end_high |= overflow << shift
+        end_bias |= (overflow - 1 - d) << shift
+        ends[shift + width - 1] = patt
+        offset += len(patt)
+
+    full = (1 << (offset * width)) - 1
+    high = (ones << (width - 1)) & full
+
+    return {'width': width, 'tables': tables, 'ones': ones, 'keep': full & ~starts, 'high': high,
+            'low': full & ~high, 'endLow': end_low, 'endHigh': end_high, 'endBias': end_bias, 'ends': ends}
+
+
+def scanMatcher(matcher, chunks):
+    """
+    Runs a matcher over chunked text, carrying the bit state across chunks.
+
+    :param matcher: Dictionary produced by buildMatcher.
+    :param chunks: Iterable of strings that together make up the sequence.
+    :return: Generator of (position, pattern) tuples, position being the 0-based start of the window.
+    """
+    width = matcher['width']
+    tables = matcher['tables']
+    ones = matcher['ones']
+    keep = matcher['keep']
+    high = matcher['high']
+    low = matcher['low']
+    end_low = matcher['endLow']
+    end_high = matcher['endHigh']
+    end_bias = matcher['endBias']
+    ends = matcher['ends']
+
+    state = 0
+    flags = 0
+    position = 0
+    for chunk in chunks:
+        for char in chunk:
+            # Shift every alignment one field along, start fresh alignments and add this character's mismatches.
+            state = ((state << width) & keep) + tables.get(char, ones)
+            flags = ((flags << width) & keep) | (state & high)
+            state &= low
+
+            # Adding the bias sets the top bit of an end field exactly when its count exceeds d.
+            hits = end_high & ~(((state & end_low) + end_bias) | flags)
+            while hits:
+                bit = hits & -hits
+                hits ^= bit
+                patt = ends[bit.bit_length() - 1]
+                start = position - len(patt) + 1
+                if start >= 0:
+                    yield start, patt
+            position += 1
+
+
+def seedPositions(seq, patt, d):
+    """
+    Pigeonhole search for a single pattern: split it into d + 1 pieces, at least one of which must occur
+    exactly in any window within distance d. Exact piece hits are found with str.find and verified.
+
+    :param seq: String to search.
+    :param patt: Pattern string, at least d + 1 characters long.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Sorted list of start positions with Hamming distance <= d.
+    """
+    d = int(d)
+    m = len(patt)
+    size = m // (d + 1)
+    last = len(seq) - m
+
+    candidates = set()
+    for piece in range(d + 1):
+        begin = piece * size
+        end = m if piece == d else begin + size
+        seed = patt[begin:end]
+        i = seq.find(seed)
+        while i != -1:
+            start = i - begin
+            if 0 <= start <= last:
+                candidates.add(start)
+            i = seq.find(seed, i + 1)
+
+    result = []
+    for start in sorted(candidates):
+        mismatches = 0
+        for a, b in zip(seq[start:start + m], patt):
+            if a != b:
+                mismatches += 1
+                if mismatches > d:
+                    break
+        if mismatches <= d:
+            result.append(start)
+    return result
+
+
+def approxPositions(seq, patterns, d):
+    """
+    :param seq: String to search.
+    :param patterns: List of pattern strings.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Dictionary of pattern -> sorted list of start positions with Hamming distance <= d.
+    """
+    result = {patt: [] for patt in patterns}
+    for position, patt in scanMatcher(buildMatcher(patterns, d), [seq]):
+        result[patt].append(position)
+    return result
+
+
+def approxCounts(seq, patterns, d):
+    """
+    :param seq: String to search.
+    :param patterns: List of pattern strings.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Dictionary of pattern -> integer count of windows with Hamming distance <= d.
+    """
+    result = {patt: 0 for patt in patterns}
+    for position, patt in scanMatcher(buildMatcher(patterns, d), [seq]):
+        result[patt] += 1
+    return result
@@ -0,0 +1,49 @@
+import os
+import pickle
+import hashlib
+
+
+def checkpointKey(name, DNA, *params):
+    """
+    Identifies a search so a checkpoint is never resumed by a different one.
+
+    :param name: String name of the search function.
+    :param DNA: List of DNA strings searched.
+    :param params: Remaining parameters that change the result (k, d, ...).
+    :return: Tuple of name, params and a digest of DNA.
+    """
+    digest = hashlib.sha1('\n'.join(DNA).encode('ascii', 'replace')).hexdigest()
+    return (name,) + params + (digest,)
+
+
+def saveCheckpoint(state, file):
+    """
+    Writes state to a temporary file first and renames it over file, so an interrupted write never
+    leaves a truncated checkpoint behind.
+
+    :param state: Picklable dictionary holding the search state, including its 'key' from checkpointKey.
+    :param file: string with file name of the checkpoint.
+    """
+    temp = file + '.tmp'
+    f = open(temp, "wb")
+    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(temp, file)
+
+
+def loadCheckpoint(file, key):
+    """
+    :param file: string with file name of the checkpoint.
+    :param key: Tuple from checkpointKey for the search being resumed.
+    :return: Dictionary saved by saveCheckpoint, or None if there is no checkpoint yet.
+    """
+    if not os.path.exists(file):
+        return None
+    f = open(file, "rb")
+    state = pickle.load(f)
+    f.close()
+    if state.get('key') != key:
+        raise ValueError(f'Checkpoint {file!r} belongs to a different search.')
+    return state
@@ -1,18 +1,30 @@
-import math
 import timeit
+from collections import Counter, deque
+from kmerEncoding import patternToCode, codeToPattern, rollingCodes, decodeCodes, kmerMask, _nucleo_code
+from multiprocessing import Pool, cpu_count
+from kmerCounter import countKmers, iterCounts, frequentCodes, parallelCountKmers, parallelKmerArrays, shardText
+from fastaReader import streamFasta
+from fmIndex import fmCount, fmLocate
+
+def pattCount(seq, patt, index=None):
+    # With a prebuilt FM-index of seq the count no longer depends on the genome length.
+    if index is not None:
+        return fmCount(index, patt)
 
-def pattCount(seq, patt):
     t_count = 0
-    for i in range(len(seq)-len(patt)):
+    for i in range(len(seq)-len(patt)+1):
         temp = seq[i:i+len(patt)]
         if temp == patt:
             t_count += 1
     return t_count
 
 
-def pattPos(seq, patt):
+def pattPos(seq, patt, index=None):
+    if index is not None:
+        return " ".join(map(str, fmLocate(index, patt)))
+
     position = []
-    for i in range(len(seq)-len(patt)):
+    for i in range(len(seq)-len(patt)+1):
         temp = seq[i:i+len(patt)]
         if temp == patt:
             position.append(i)
@@ -20,116 +32,177 @@ def pattPos(seq, patt):
     return position
 
 
-def frequentWords(text, k):
-    freqpatt = []
-    count = []
-    for i in range(len(text)-k):
-        pattern = text[i:i+k]
-        temp = pattCount(text, pattern)
-        count.append(temp)
-    max_count = max(count)
-    for i in range(len(text)-k):
-        if count[i] == max_count:
-            freqpatt.append(text[i:i+k])
-            freqpatt = list(set(freqpatt))
-            str1 = ' '.join(freqpatt)
-    return str1
-
-
-def fastFrequentWords(text, k):
-    freq_patt = []
-    freq_array = computingFreq(text, k)
-    max_count = max(freq_array)
-    for i in range(int(math.pow(4, k))):
-        if freq_array[i] == max_count:
-            pattern = numberToPattern(i, k)
-            freq_patt.append(pattern)
-    return freq_patt
+def frequentWords(text, k, processes=None):
+    # Serial and parallel runs count the same table, processes only changes the speed.
+    if processes:
+        freq = parallelKmerArrays(text, k, processes=processes) if k <= 32 else \
+            parallelCountKmers(text, k, processes=processes)
+    else:
+        freq = countKmers(text, k)
+    return ' '.join(decodeCodes(frequentCodes(freq), k))
+
+
+def fastFrequentWords(text, k, mode=None, processes=None):
+    # Counts are kept sparse automatically once 4^k dwarfs the text length.
+    if processes:
+        freq_array = parallelKmerArrays(text, k, mode, processes) if k <= 32 else \
+            parallelCountKmers(text, k, mode, processes)
+    else:
+        freq_array = countKmers(text, k, mode)
+    return decodeCodes(frequentCodes(freq_array), k)
 
 
 def patternToNumber(seq):
-    result = 0
-    nucleo = ["A", "C", "G", "T"]
-    for i in range(len(seq)):
-        expo = len(seq) - 1 - i
-        result += (nucleo.index(seq[i]) * math.pow(4, expo))
-    return int(result)
+    return patternToCode(seq)
 
 
 def numberToPattern(number, k):
-    nucleo = ["A", "C", "G", "T"]
-    result = ""
-    tempnum = number
-
-    for i in range(k):
-        remainder = int(tempnum % 4)
-        tempnum = int(tempnum/4)
-        result += nucleo[remainder]
-
-    return result[::-1]
-
-def computingFreq(text, k):
-    freqArray = []
-    for i in range(int(math.pow(4, k))):
-        freqArray.append(0)
-
-    for i in range(len(text) - k + 1):
-        value = text[i:i+k]
-        num = patternToNumber(value)
-        freqArray[num] += 1
+    return codeToPattern(int(number), k)
+
+def computingFreq(text, k, mode='dense', processes=None):
+    if processes:
+        freqArray = parallelCountKmers(text, k, mode, processes)
+    else:
+        freqArray = countKmers(text, k, mode)
     #return " ".join(map(str, freqArray))
     return freqArray
 
 
 
-def clumpFinding(genome, k, L, t):
-    freq_patt = []
-    clump = []
+def clumpFinding(genome, k, L, t, processes=None):
+    if processes:
+        return parallelClumpFinding(genome, k, L, t, processes)
 
-    for i in range(int(math.pow(4, k))):
-        clump.append(0)
-    for i in range(len(genome) - L + 1):
-        text = genome[i:i+L]
-        freq_array = computingFreq(text, k)
-        for index in range(int(math.pow(4, k))):
-            if freq_array[index] >= t:
-                clump[index] = 1
-
-    for i in range(int(math.pow(4, k))):
-        if clump[i] == 1:
-            pattern = numberToPattern(i, k)
-            freq_patt.append(pattern)
-
-    return freq_patt
-
-
-def betterClumpFinding(genome, k, L, t):
-    freq_patt = []
-    clump = []
-
-    for i in range(int(math.pow(4, k))):
-        clump.append(0)
-    text = genome[:L]
-    freq_array = computingFreq(text, k)
-    for i in range(int(math.pow(4, k))):
-        if freq_array[i] >= t:
-            clump[i] = 1
+    clump = set()
+
+    # Encode every k-mer once, each window of length L then holds L - k + 1 consecutive codes.
+    codes = list(rollingCodes(genome, k))
     for i in range(len(genome) - L + 1):
-        first_patt = genome[i:i+k]
-        index = patternToNumber(first_patt)
-        freq_array[index] -= 1
-        last_patt = genome[i + L - k: i + L]
-        index = patternToNumber(last_patt)
+        freq = Counter(codes[i:i + L - k + 1])
+        for index, count in freq.items():
+            if count >= t:
+                clump.add(index)
+
+    return decodeCodes(sorted(clump), k)
+
+
+def betterClumpFinding(genome, k, L, t, mode=None):
+    clump = set()
+    if len(genome) < L:
+        return []
+
+    codes = list(rollingCodes(genome, k))
+    window = L - k + 1
+    freq_array = countKmers(genome[:L], k, mode)
+    for i, count in iterCounts(freq_array):
+        if count >= t:
+            clump.add(i)
+
+    # Slide the window one base at a time: drop its first k-mer, add the new last k-mer.
+    for i in range(1, len(genome) - L + 1):
+        freq_array[codes[i - 1]] -= 1
+        index = codes[i + window - 1]
         freq_array[index] += 1
 
         if freq_array[index] >= t:
-            clump[index] = 1
-
-    for i in range(int(math.pow(4, k))):
-        if clump[i] == 1:
-            pattern = numberToPattern(i, k)
-            freq_patt.append(pattern)
-
-    return freq_patt
-
-
+            clump.add(index)
+
+    return decodeCodes(sorted(clump), k)
+
+
+def _clumpShard(args):
+    genome, k, L, t = args
+    return betterClumpFinding(genome, k, L, t)
+
+
+def parallelClumpFinding(genome, k, L, t, processes=None):
+    """
+    Runs betterClumpFinding over shards of the genome in a process pool. Shards overlap by L - 1 bases so
+    every L-window is seen by exactly one worker, and the clumps found per shard are combined.
+
+    :param genome: String of genome data.
+    :param k: Integer for k-mer size.
+    :param L: Integer for window length.
+    :param t: Integer for minimum number of occurrences within a window.
+    :param processes: Integer number of worker processes, defaults to the number of CPUs.
+    :return: Sorted list of clump k-mer strings.
+    """
+    if processes is None:
+        processes = cpu_count()
+
+    shards = shardText(genome, L, processes)
+    with Pool(processes) as pool:
+        results = pool.map(_clumpShard, [(shard, k, L, t) for shard in shards])
+    return sorted(set().union(*results))
+
+
+def streamClumpFinding(file, k, L, t, chunkSize=1 << 20):
+    """
+    Streaming version of betterClumpFinding for genomes too large to hold in memory. The FASTA file is
+    read in chunks and only the k-mer codes of the current L-window are kept, in a ring buffer, so the
+    sliding counts carry over chunk boundaries. Windows are not carried across records, and k-mers
+    spanning non-ACGT bases are not counted.
+
+    :param file: string with file name of FASTA genome.
+    :param k: Integer for k-mer size.
+    :param L: Integer for window length.
+    :param t: Integer for minimum number of occurrences within a window.
+    :param chunkSize: Integer, approximate number of bases read per chunk.
+    :return: Generator of clump k-mer strings, each yielded once, as soon as it is found.
+    """
+    mask = kmerMask(k)
+    slots = L - k + 1
+    emitted = set()
+    record = object()
+
+    for header, chunk in streamFasta(file, chunkSize):
+        if header != record:
+            # New record, start from an empty window.
+            record = header
+            ring = deque()
+            counts = {}
+            code = 0
+            filled = 0
+            seen = 0
+            full = False
+
+        for base in chunk:
+            value = _nucleo_code.get(base)
+            if value is None:
+                filled = 0
+                new = None
+            else:
+                code = ((code << 2) | value) & mask
+                filled = min(filled + 1, k)
+                new = code if filled == k else None
+
+            # Every base from the k-th onwards ends one k-mer slot, None if it spans an invalid base.
+            seen += 1
+            if seen < k:
+                continue
+
+            # Drop the k-mer leaving the window before adding the new one.
+            if len(ring) == slots:
+                old = ring.popleft()
+                if old is not None:
+                    counts[old] -= 1
+                    if counts[old] == 0:
+                        del counts[old]
+            ring.append(new)
+            if new is not None:
+                counts[new] = counts.get(new, 0) + 1
+
+            if len(ring) < slots:
+                continue
+
+            if not full:
+                # First complete window of the record, check everything counted so far.
+                full = True
+                for index, count in counts.items():
+                    if count >= t and index not in emitted:
+                        emitted.add(index)
+                        yield codeToPattern(index, k)
+
+            elif new is not None and counts[new] >= t and new not in emitted:
+                emitted.add(new)
+                yield codeToPattern(new, k)
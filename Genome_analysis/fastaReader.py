@@ -0,0 +1,52 @@
+def streamFasta(file, chunkSize=1 << 20):
+    """
+    Reads a FASTA (or plain sequence) file in fixed-size pieces without loading the whole genome.
+
+    :param file: string with file name
+    :param chunkSize: Integer, approximate number of bases per yielded chunk.
+    :return: Generator of (header, chunk) tuples. Header is the record name without '>' (None for files
+             without headers) and chunk is an upper-case sequence string with line breaks removed.
+             Consecutive chunks with the same header belong to the same record.
+    """
+    header = None
+    parts = []
+    size = 0
+    line_start = True
+
+    f = open(file, "r")
+    try:
+        while True:
+            # readline with a size limit keeps memory bounded even for unwrapped single-line genomes.
+            line = f.readline(chunkSize)
+            if not line:
+                break
+
+            if line_start and line.startswith('>'):
+                if parts:
+                    yield header, ''.join(parts)
+                    parts = []
+                    size = 0
+                header = line[1:]
+                while not header.endswith('\n'):
+                    rest = f.readline(chunkSize)
+                    if not rest:
+                        break
+                    header += rest
+                header = header.strip()
+                line_start = True
+                continue
+
+            line_start = line.endswith('\n')
+            seq = line.strip().upper()
+            if seq:
+                parts.append(seq)
+                size += len(seq)
+            if size >= chunkSize:
+                yield header, ''.join(parts)
+                parts = []
+                size = 0
+
+        if parts:
+            yield header, ''.join(parts)
+    finally:
+        f.close()
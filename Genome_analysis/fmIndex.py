@@ -0,0 +1,168 @@
+import pickle
+import numpy as np
+
+
+def suffixArray(text):
+    """
+    Builds the suffix array of text by prefix doubling on NumPy arrays. Each round sorts the suffixes by
+    the pair (rank of the first step characters, rank of the next step characters), packed into one int64
+    key, and re-ranks them from the sorted keys.
+
+    :param text: String, normally ending in a unique smallest sentinel such as '$'.
+    :return: int64 array of starting positions of all suffixes in lexicographic order.
+    """
+    n = len(text)
+    rank = np.frombuffer(text.encode('ascii'), dtype=np.uint8).astype(np.int32)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    step = 1
+
+    while True:
+        # Ranks past the end of text count as -1, the smallest; shifted by one they stay non-negative.
+        second = np.zeros(n, dtype=np.int64)
+        second[:n - step] = rank[step:].astype(np.int64) + 1
+        key = rank.astype(np.int64) * (int(rank.max()) + 2) + second
+        del second
+        sa = np.argsort(key)
+
+        sorted_key = key[sa]
+        del key
+        new_rank = np.empty(n, dtype=np.int32)
+        new_rank[sa] = np.concatenate([[0], np.cumsum(sorted_key[1:] != sorted_key[:-1], dtype=np.int32)])
+        rank = new_rank
+        del sorted_key
+
+        if rank.max() == n - 1 or step >= n:
+            return sa
+        step *= 2
+
+
+def buildFMIndex(genome, sampleRate=32, checkpointRate=64):
+    """
+    Builds an FM-index (Burrows-Wheeler transform with occurrence checkpoints and a sampled suffix array).
+
+    :param genome: String of genome data, must not contain '$'.
+    :param sampleRate: Integer, every suffix array value divisible by it is kept for locate queries.
+    :param checkpointRate: Integer, occurrence counts are stored every checkpointRate rows of the BWT.
+    :return: Dictionary holding the index.
+    """
+    text = genome + '$'
+    sa = suffixArray(text)
+    data = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    # Position -1 wraps around to the '$' at the end of text.
+    bwt_array = data[sa - 1]
+    bwt = bwt_array.tobytes().decode('ascii')
+
+    # First column starting row of every symbol.
+    first = {}
+    total = 0
+    symbol_counts = np.bincount(bwt_array, minlength=256)
+    for code in np.flatnonzero(symbol_counts):
+        first[chr(code)] = total
+        total += int(symbol_counts[code])
+
+    # Occurrences of every symbol before each checkpoint row, block sums of the BWT added up.
+    blocks = -(-len(bwt_array) // checkpointRate)
+    padded = np.zeros(blocks * checkpointRate, dtype=np.uint8)
+    padded[:len(bwt_array)] = bwt_array
+    checkpoints = {}
+    for char in first:
+        per_block = (padded.reshape(blocks, checkpointRate) == ord(char)).sum(axis=1)
+        checkpoints[char] = np.concatenate([[0], np.cumsum(per_block)]).astype(np.int64)
+
+    # Sampled suffix array as two parallel arrays: the sorted rows kept and their text positions.
+    sampled_rows = np.flatnonzero(sa % sampleRate == 0)
+    sampled_positions = sa[sampled_rows]
+
+    return {'bwt': bwt, 'first': first, 'checkpoints': checkpoints, 'sampledRows': sampled_rows,
+            'sampledPositions': sampled_positions, 'sampleRate': sampleRate, 'checkpointRate': checkpointRate}
+
+
+def saveIndex(index, file):
+    """
+    :param index: Dictionary produced by buildFMIndex.
+    :param file: string with file name to write.
+    """
+    f = open(file, "wb")
+    pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.close()
+
+
+def loadIndex(file):
+    """
+    :param file: string with file name written by saveIndex.
+    :return: Dictionary holding the index.
+    """
+    f = open(file, "rb")
+    index = pickle.load(f)
+    f.close()
+    return index
+
+
+def occurrences(index, char, row):
+    """
+    :param index: Dictionary produced by buildFMIndex.
+    :param char: Single character.
+    :param row: Integer row of the BWT.
+    :return: Integer count of char in bwt[:row].
+    """
+    checkpoints = index['checkpoints'].get(char)
+    if checkpoints is None:
+        return 0
+    rate = index['checkpointRate']
+    block = row // rate
+    return int(checkpoints[block]) + index['bwt'].count(char, block * rate, row)
+
+
+def _backwardSearch(index, patt):
+    top = 0
+    bottom = len(index['bwt'])
+    first = index['first']
+    for char in reversed(patt):
+        if char not in first:
+            return 0, 0
+        top = first[char] + occurrences(index, char, top)
+        bottom = first[char] + occurrences(index, char, bottom)
+        if top >= bottom:
+            return 0, 0
+    return top, bottom
+
+
+def fmCount(index, patt):
+    """
+    Counts the occurrences of patt in O(m) backward-search steps.
+
+    :param index: Dictionary produced by buildFMIndex.
+    :param patt: Pattern string.
+    :return: Integer count of (overlapping) occurrences.
+    """
+    top, bottom = _backwardSearch(index, patt)
+    return bottom - top
+
+
+def fmLocate(index, patt):
+    """
+    Finds every position of patt, walking each matching row back to the nearest sampled suffix.
+
+    :param index: Dictionary produced by buildFMIndex.
+    :param patt: Pattern string.
+    :return: Sorted list of 0-based start positions.
+    """
+    bwt = index['bwt']
+    first = index['first']
+    rows = index['sampledRows']
+    positions = index['sampledPositions']
+    top, bottom = _backwardSearch(index, patt)
+
+    result = []
+    for row in range(top, bottom):
+        steps = 0
+        while True:
+            slot = int(np.searchsorted(rows, row))
+            if slot < len(rows) and rows[slot] == row:
+                break
+            char = bwt[row]
+            row = first[char] + occurrences(index, char, row)
+            steps += 1
+        result.append(int(positions[slot]) + steps)
+    return sorted(result)
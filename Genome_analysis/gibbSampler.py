@@ -1,6 +1,13 @@
-
 import random
 from functools import reduce
+from multiprocessing import Pool, Value, cpu_count
+import numpy as np
+from motifMatrix import encodeArray, countMatrix, countLists, profileMatrix, profileDict, scoreCounts, logProfile, \
+    scoreWindows, addRow, removeRow
+from checkpoint import checkpointKey, saveCheckpoint, loadCheckpoint
+
+# Best score of all chains run by the current parallelGibbsSampler pool.
+_shared_best = None
 
 def getInput(file):
     """
@@ -29,20 +36,9 @@ def countMotif(motifs, pseudo=False):
     :param psuedo: If true, adds psuedocounts of 1 to each count.
     :return: Count of each column in A, C, G, T format.
     """
-    result = []
-    for i in range(len(motifs[0])):
-        column = [row[i] for row in motifs]
-        a_count = column.count("A")
-        c_count = column.count("C")
-        g_count = column.count("G")
-        t_count = column.count("T")
-
-        if pseudo is True:
-            column_counts = [a_count + 1, c_count + 1, g_count + 1, t_count + 1]
-        else:
-            column_counts = [a_count, c_count, g_count, t_count]
-        result.append(column_counts)
-    return result
+    if pseudo is True:
+        return countLists(countMatrix(motifs), pseudo=1)
+    return countLists(countMatrix(motifs))
 
 
 def profile(motifs, pseudo=False):
@@ -54,17 +50,8 @@ def profile(motifs, pseudo=False):
     :return: Dictionary with probabilities of nucleotide per column.
     """
     if pseudo is True:
-        counts = countMotif(motifs, pseudo=True)
-    else:
-        counts = countMotif(motifs)
-    result = {'A': [], 'C': [], 'G': [], 'T': []}
-    for column in counts:
-        percent = [element / sum(column) for element in column]
-        result['A'].append(percent[0])
-        result['C'].append(percent[1])
-        result['G'].append(percent[2])
-        result['T'].append(percent[3])
-    return result
+        return profileDict(profileMatrix(countMatrix(motifs), pseudo=1))
+    return profileDict(profileMatrix(countMatrix(motifs)))
 
 
 def scoreMotif(motifs):
@@ -75,9 +62,7 @@ def scoreMotif(motifs):
     :param motifs: List of motifs strings.
     :return: Integer equal to the nucleotide differences between all strings.
     """
-    counts = countMotif(motifs)
-    result = [sum(i)-max(i) for i in counts]
-    return sum(result)
+    return scoreCounts(countMatrix(motifs))
 
 
 def computeProfile(consensus, profile):
@@ -100,42 +85,43 @@ def computeProfile(consensus, profile):
     return reduce(lambda x, y: x*y, result)
 
 
-def randomMotif(DNA, k):
+def randomMotif(DNA, k, rng=random):
     """
     :param DNA: List of strings containing DNA.
     :param k: Integer corresponding to K-mer size.
+    :param rng: Random number generator, the random module or a random.Random instance.
     :return: List of randomly selected K-mers for each string in DNA.
     """
-    return [randomKmer(seq, k) for seq in DNA]
+    return [randomKmer(seq, k, rng) for seq in DNA]
 
 
-def randomKmer(seq, k):
+def randomKmer(seq, k, rng=random):
     """
     :param seq: Single string
     :param k: Integer corresponding to K-mer size.
+    :param rng: Random number generator, the random module or a random.Random instance.
     :return: Randomly selected slice of seq string of size K.
     """
-    position = random.randint(0, len(seq)-k)
+    position = rng.randint(0, len(seq)-k)
     return seq[position:position+k]
 
 
-def randomSelect(probabilities):
+def randomSelect(probabilities, rng=random):
     """
     Randomly select a K-mer by giving the corresponding index based on weighted probabilities.
+    The weights are summed cumulatively once and the draw is located by binary search.
 
-    :param probabilities: List of probabilities.
+    :param probabilities: List or array of probabilities, need not be normalized.
+    :param rng: Random number generator, the random module or a random.Random instance.
     :return: Integer corresponding to index of selected K-mer.
     """
-    total = float(sum(probabilities))
-    incSum = 0.0
-    rand = random.random()
-    for i in range(len(probabilities)):
-        incSum += probabilities[i]/total
-        if incSum >= rand:
-            return i
+    cumulative = np.cumsum(probabilities, dtype=np.float64)
+    rand = rng.random() * cumulative[-1]
+    # Rounding can leave the last cumulative value just below the draw.
+    return min(int(np.searchsorted(cumulative, rand)), len(cumulative) - 1)
 
 
-def gibbsSampler(DNA, k, t, N):
+def gibbsSampler(DNA, k, t, N, rng=random):
     """
     Primary function to find optimal motifs of list of DNA based on rolling-dice method.
 
@@ -143,53 +129,157 @@ def gibbsSampler(DNA, k, t, N):
     :param k: Integer corresponding to K-mer size.
     :param t: Integer corresponding to length of DNA list.
     :param N: Integer corresponding to number of iterations should occur.
+    :param rng: Random number generator, the random module or a random.Random instance.
     :return: Best motifs obtained from this occurrence of the function as a list as well as score as integer.
     """
-    motifs = randomMotif(DNA, k)
-    bestMotifs = motifs
+    bestScore, bestMotifs, iterations = _gibbsChain(DNA, k, t, N, rng)
+    return bestScore, bestMotifs
+
+
+def _gibbsChain(DNA, k, t, N, rng=random, patience=None):
+    """
+    Runs one Gibbs sampling chain. With patience, the chain stops once it has gone that many iterations
+    without reaching the best score found so far. On its own that is the chain's best score; under
+    parallelGibbsSampler it is the best score shared by all chains, so chains trailing the others stop early.
+
+    :return: Tuple of best score, best motifs and number of iterations run.
+    """
+    # Every string is encoded once. Motifs are kept as start positions into the encoded strings.
+    encoded = [encodeArray(seq) for seq in DNA]
+    starts = [rng.randint(0, len(seq)-k) for seq in DNA]
+    bestStarts = starts[:]
+
+    # Running count matrix of the current motifs, updated in O(k) per iteration.
+    counts = countMatrix(np.stack([row[start:start+k] for row, start in zip(encoded, starts)]))
+    bestScore = scoreCounts(counts)
+    _publishBest(bestScore)
+    stalled = 0
+    iterations = 0
 
     for iteration in range(N):
-        randInt = random.randint(0, t-1)
+        iterations += 1
+        randInt = rng.randint(0, t-1)
 
         # Create profile excluding randomly selected string.
-        minus_profile = profile(motifs[:randInt] + motifs[randInt+1:], pseudo=True)
+        row = encoded[randInt]
+        removeRow(counts, row[starts[randInt]:starts[randInt]+k])
+        minus_profile = profileMatrix(counts, pseudo=1)
 
         # Calculate probabilities of all K-mers in randomly selected string.
-        prob_lst = [computeProfile(DNA[randInt][i:i+k], minus_profile) for i in range(len(DNA[randInt])-k+1)]
+        # Scored in log space and rescaled to the best window, only relative weights matter for selection.
+        scores = scoreWindows(row, logProfile(minus_profile))
+        prob_lst = np.exp(scores - scores.max())
 
         # Randomly select K-mer based on weighted probabilities.
-        select = randomSelect(prob_lst)
+        select = randomSelect(prob_lst, rng)
 
         # Replace randomly selected motif with new motif.
-        motifs[randInt] = DNA[randInt][select:select+k]
+        starts[randInt] = select
+        addRow(counts, row[select:select+k])
+
+        score = scoreCounts(counts)
+        stalled += 1
+        if score < bestScore:
+            bestStarts = starts[:]
+            bestScore = score
+            if _publishBest(bestScore):
+                stalled = 0
 
-        if scoreMotif(motifs) < scoreMotif(bestMotifs):
-            bestMotifs = motifs[:]
+        if patience and stalled >= patience:
+            break
 
-    return scoreMotif(bestMotifs), bestMotifs
+    bestMotifs = [seq[start:start+k] for seq, start in zip(DNA, bestStarts)]
+    return bestScore, bestMotifs, iterations
 
 
-def repeatGibbsSampler(DNA, k, t, N, R):
+def repeatGibbsSampler(DNA, k, t, N, R, checkpoint=None):
     """
     Repeats the primary gibbsSampler by R amount of times. Keeps the best motifs and scores of all repeats.
     This allows new random starting points to occur, increasing chances of converging towards best motifs.
+    With a checkpoint file, the restart index, best motifs and random state are saved after every restart
+    and an existing checkpoint is resumed, giving the same result as an uninterrupted run.
 
     :param DNA: List of DNA strings/motifs.
     :param k: Integer corresponding to K-mer size.
     :param t: Integer corresponding to length of DNA list.
     :param N: Integer corresponding to number of iterations should occur.
     :param R: Integer corresponding to number of repeats that gibbsSampler function should be repeated
+    :param checkpoint: string with file name of the checkpoint, None to keep no checkpoint.
     :return: List of strings consisting of best motifs obtained.
     """
-    bestMotifs = randomMotif(DNA, k)
-    bestScore = scoreMotif(bestMotifs)
-    for i in range(R):
-        print(i)
+    key = checkpointKey('repeatGibbsSampler', DNA, k, t, N)
+    state = loadCheckpoint(checkpoint, key) if checkpoint else None
+    if state is None:
+        bestMotifs = randomMotif(DNA, k)
+        state = {'key': key, 'restart': 0, 'bestMotifs': bestMotifs, 'bestScore': scoreMotif(bestMotifs)}
+    else:
+        random.setstate(state['random'])
+
+    for i in range(state['restart'], R):
         cur_score, cur_motifs = gibbsSampler(DNA, k, t, N)
-        if cur_score < bestScore:
-            bestMotifs = cur_motifs
-            bestScore = cur_score
-    return bestMotifs
+        if cur_score < state['bestScore']:
+            state['bestMotifs'] = cur_motifs
+            state['bestScore'] = cur_score
+        if checkpoint:
+            state['restart'] = i + 1
+            state['random'] = random.getstate()
+            saveCheckpoint(state, checkpoint)
+    return state['bestMotifs']
 
 
-t
\ No newline at end of file
+def _publishBest(score):
+    """
+    Publishes a chain's best score to the score shared by all chains.
+
+    :param score: Integer best score of the calling chain.
+    :return: True if score is at least as good as the shared best score, always True outside a pool.
+    """
+    if _shared_best is None:
+        return True
+    with _shared_best.get_lock():
+        if score > _shared_best.value:
+            return False
+        _shared_best.value = score
+        return True
+
+
+def _initShared(best):
+    global _shared_best
+    _shared_best = best
+
+
+def _gibbsRestart(args):
+    DNA, k, t, N, seed, patience = args
+    return _gibbsChain(DNA, k, t, N, random.Random(seed), patience)
+
+
+def parallelGibbsSampler(DNA, k, t, N, R, processes=None, seed=None, patience=None):
+    """
+    Runs R gibbsSampler chains across a process pool. Every chain gets its own random.Random seeded from
+    one SeedSequence, so each chain is reproducible from seed. Chains share the best score found so far;
+    with patience, a chain stops once it has gone that many iterations without reaching the shared best.
+    Its stopping point then depends on what the other chains have found, and so on how they are scheduled.
+
+    :param DNA: List of DNA strings/motifs.
+    :param k: Integer corresponding to K-mer size.
+    :param t: Integer corresponding to length of DNA list.
+    :param N: Integer corresponding to the maximum number of iterations per chain.
+    :param R: Integer corresponding to number of chains.
+    :param processes: Integer number of worker processes, defaults to the number of CPUs.
+    :param seed: Integer seed for the chain seeds, None for fresh entropy.
+    :param patience: Integer number of iterations without improvement before a chain stops early.
+    :return: Best motifs as a list of strings, and a list of per-chain dictionaries with
+             chain, seed, score and iterations.
+    """
+    if processes is None:
+        processes = cpu_count()
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(R)]
+
+    best = Value('i', k * len(DNA) + 1)
+    with Pool(processes, initializer=_initShared, initargs=(best,)) as pool:
+        results = pool.map(_gibbsRestart, [(DNA, k, t, N, chain_seed, patience) for chain_seed in seeds])
+
+    stats = [{'chain': i, 'seed': chain_seed, 'score': score, 'iterations': iterations}
+             for i, (chain_seed, (score, motifs, iterations)) in enumerate(zip(seeds, results))]
+    bestScore, bestMotifs, iterations = min(results, key=lambda result: result[0])
+    return bestMotifs, stats
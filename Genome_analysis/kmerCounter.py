@@ -0,0 +1,220 @@
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+import numpy as np
+from kmerEncoding import rollingCodes, encodeArray
+
+# Switch to sparse counting once 4^k is this many times larger than the number of windows.
+_sparse_ratio = 8
+
+
+def chooseMode(n, k):
+    """
+    Picks the counting backend for a text of length n.
+
+    :param n: Integer length of text.
+    :param k: Integer for k-mer size.
+    :return: 'sparse' when a dense 4^k table would be mostly empty, otherwise 'dense'.
+    """
+    windows = max(n - k + 1, 1)
+    if 4 ** k > _sparse_ratio * windows:
+        return 'sparse'
+    return 'dense'
+
+
+def countKmers(text, k, mode=None):
+    """
+    Counts every k-mer of text by its integer code.
+
+    :param text: String of genome data.
+    :param k: Integer for k-mer size.
+    :param mode: 'dense' for a list of 4^k counts, 'sparse' for a Counter holding only the k-mers present.
+                 Default picks one based on k and the length of text.
+    :return: Count table indexable by k-mer code.
+    """
+    if mode is None:
+        mode = chooseMode(len(text), k)
+
+    if mode in ['dense']:
+        freq = [0] * (4 ** k)
+        for code in rollingCodes(text, k):
+            freq[code] += 1
+        return freq
+
+    elif mode in ['sparse']:
+        return Counter(rollingCodes(text, k))
+
+    else:
+        raise ValueError(f'Unknown counting mode {mode!r}.')
+
+
+def iterCounts(freq):
+    """
+    :param freq: Dense or sparse count table.
+    :return: Generator of (code, count) tuples for every k-mer with a non-zero count.
+    """
+    if isinstance(freq, dict):
+        return ((code, count) for code, count in freq.items() if count)
+    return ((code, count) for code, count in enumerate(freq) if count)
+
+
+def maxCount(freq):
+    """
+    :param freq: Dense or sparse count table, or a NumPy table from parallelKmerArrays.
+    :return: Integer count of the most frequent k-mer, 0 if the table is empty.
+    """
+    if isinstance(freq, tuple):
+        freq = freq[1]
+    if isinstance(freq, np.ndarray):
+        return int(freq.max(initial=0))
+    if isinstance(freq, dict):
+        return max(freq.values(), default=0)
+    return max(freq, default=0)
+
+
+def frequentCodes(freq):
+    """
+    :param freq: Dense or sparse count table, or a NumPy table from parallelKmerArrays.
+    :return: Sorted list of codes whose count equals the maximum count.
+    """
+    max_count = maxCount(freq)
+    if max_count == 0:
+        return []
+    if isinstance(freq, tuple):
+        return freq[0][freq[1] == max_count].tolist()
+    if isinstance(freq, np.ndarray):
+        return np.flatnonzero(freq == max_count).tolist()
+    return sorted(code for code, count in iterCounts(freq) if count == max_count)
+
+
+def shardText(text, width, shards):
+    """
+    Splits text into overlapping shards so that every window of the given width lies in exactly one shard.
+    Consecutive shards overlap by width - 1 characters, so no window is dropped or counted twice.
+
+    :param text: String of genome data.
+    :param width: Integer window width, k for k-mer counting or L for clump finding.
+    :param shards: Integer for the number of shards wanted.
+    :return: List of shard strings.
+    """
+    windows = len(text) - width + 1
+    if windows <= 0:
+        return [text]
+    shards = max(1, min(shards, windows))
+    step = -(-windows // shards)
+
+    result = []
+    for start in range(0, windows, step):
+        end = min(start + step, windows)
+        result.append(text[start:end + width - 1])
+    return result
+
+
+def mergeCounts(tables):
+    """
+    Merges count tables of the same k into one.
+
+    :param tables: List of dense or sparse count tables. NumPy tables from the workers of parallelCountKmers
+                   (4^k count arrays, or (codes, counts) array tuples) are merged as arrays.
+    :return: Dense list if every table is dense, otherwise a Counter. For NumPy tables, a summed count array
+             if every table is dense, otherwise a (codes, counts) tuple of sorted unique codes.
+    """
+    if all(isinstance(table, np.ndarray) for table in tables):
+        total = np.zeros(len(tables[0]), dtype=np.int64)
+        for table in tables:
+            total += table
+        return total
+
+    if all(isinstance(table, tuple) for table in tables):
+        codes, inverse = np.unique(np.concatenate([table[0] for table in tables]), return_inverse=True)
+        counts = np.bincount(inverse.ravel(), np.concatenate([table[1] for table in tables]),
+                             minlength=len(codes))
+        return codes, counts.astype(np.int64)
+
+    if all(isinstance(table, list) for table in tables):
+        return [sum(column) for column in zip(*tables)]
+
+    result = Counter()
+    for table in tables:
+        if isinstance(table, dict):
+            result.update(table)
+        else:
+            result.update(dict(iterCounts(table)))
+    return result
+
+
+def shardCodes(text, k):
+    """
+    Vectorized rollingCodes for one shard.
+
+    :param text: String of genome data.
+    :param k: Integer for k-mer size, at most 32.
+    :return: uint64 array with the code of every k-mer window, in order.
+    """
+    symbols = encodeArray(text)
+    if len(symbols) and symbols.max() == 4:
+        raise ValueError(f'Invalid nucleotide {text[int(np.argmax(symbols == 4))]!r} in text.')
+    if len(symbols) < k:
+        return np.empty(0, dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(symbols, k)
+    codes = np.zeros(len(windows), dtype=np.uint64)
+    for j in range(k):
+        codes = (codes << np.uint64(2)) | windows[:, j].astype(np.uint64)
+    return codes
+
+
+def _countShard(args):
+    # Workers send back NumPy arrays, which pickle as raw buffers, and the parent merges them as arrays.
+    text, k, mode = args
+    codes = shardCodes(text, k)
+    if mode in ['dense']:
+        return np.bincount(codes.astype(np.int64), minlength=4 ** k).astype(np.uint32)
+    codes, counts = np.unique(codes, return_counts=True)
+    return codes, counts.astype(np.uint32)
+
+
+def parallelKmerArrays(text, k, mode=None, processes=None):
+    """
+    Counts k-mers of text across a process pool. The text is cut into one shard per process with an
+    overlap of k - 1 bases, each shard is counted separately and the tables are merged as arrays.
+
+    :param text: String of genome data.
+    :param k: Integer for k-mer size, at most 32.
+    :param mode: 'dense', 'sparse' or None to choose from k and the length of the whole text.
+    :param processes: Integer number of worker processes, defaults to the number of CPUs.
+    :return: int64 array of 4^k counts for 'dense', (sorted codes, counts) array tuple for 'sparse'.
+    """
+    if mode is None:
+        mode = chooseMode(len(text), k)
+    if mode not in ['dense', 'sparse']:
+        raise ValueError(f'Unknown counting mode {mode!r}.')
+    if processes is None:
+        processes = cpu_count()
+
+    shards = shardText(text, k, processes)
+    if len(shards) == 1:
+        return mergeCounts([_countShard((text, k, mode))])
+    with Pool(processes) as pool:
+        tables = pool.map(_countShard, [(shard, k, mode) for shard in shards])
+    return mergeCounts(tables)
+
+
+def parallelCountKmers(text, k, mode=None, processes=None):
+    """
+    parallelKmerArrays with the result in countKmers format.
+
+    :param text: String of genome data.
+    :param k: Integer for k-mer size.
+    :param mode: 'dense', 'sparse' or None to choose from k and the length of the whole text.
+    :param processes: Integer number of worker processes, defaults to the number of CPUs.
+    :return: Merged count table, same format as countKmers.
+    """
+    if mode is None:
+        mode = chooseMode(len(text), k)
+    if k > 32:
+        return countKmers(text, k, mode)
+
+    merged = parallelKmerArrays(text, k, mode, processes)
+    if mode in ['dense']:
+        return merged.tolist()
+    codes, counts = merged
+    return Counter(dict(zip(codes.tolist(), counts.tolist())))
@@ -0,0 +1,123 @@
+import itertools
+import numpy as np
+
+_nucleo_code = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+_code_nucleo = 'ACGT'
+
+# Every 4-mer as a string, indexed by its 8-bit code. Used to decode four bases at a time.
+_byte_table = [''.join(x) for x in itertools.product(_code_nucleo, repeat=4)]
+
+# Byte value -> base index. Anything other than A, C, G, T maps to 4.
+_base_index = np.full(256, 4, dtype=np.uint8)
+_base_index[[ord('A'), ord('C'), ord('G'), ord('T')]] = [0, 1, 2, 3]
+
+
+def kmerMask(k):
+    """
+    :param k: Integer for k-mer size.
+    :return: Integer with the lowest 2k bits set, used to drop the oldest base of a rolling code.
+    """
+    return (1 << (2 * k)) - 1
+
+
+def patternToCode(pattern):
+    """
+    Encodes a DNA string as an integer using 2 bits per base (A=0, C=1, G=2, T=3).
+
+    :param pattern: String of nucleotides.
+    :return: Integer code of pattern.
+    """
+    code = 0
+    try:
+        for base in pattern:
+            code = (code << 2) | _nucleo_code[base]
+    except KeyError as error:
+        raise ValueError(f'Invalid nucleotide {error.args[0]!r} in pattern.') from None
+    return code
+
+
+def encodeArray(seq):
+    """
+    :param seq: String of nucleotides.
+    :return: uint8 array of base indices (A=0, C=1, G=2, T=3, anything else 4).
+    """
+    return _base_index[np.frombuffer(seq.encode('ascii', 'replace'), dtype=np.uint8)]
+
+
+def codeToPattern(code, k):
+    """
+    Decodes an integer code back into its DNA string, four bases per table lookup.
+
+    :param code: Integer code of k-mer.
+    :param k: Integer for k-mer size.
+    :return: String of k-mer.
+    """
+    chunks = []
+    for i in range((k + 3) // 4):
+        chunks.append(_byte_table[code & 255])
+        code >>= 8
+    # Leading padding decodes to 'A' and is sliced off.
+    return ''.join(reversed(chunks))[-k:] if k else ''
+
+
+def rollingCodes(text, k):
+    """
+    Yields the integer code of every k-mer window of text, in order. The code is kept as a rolling
+    integer: each new base is shifted in and the oldest base is masked off, so no window is sliced.
+
+    :param text: String of genome data.
+    :param k: Integer for k-mer size.
+    :return: Generator of integer codes, one per window (len(text) - k + 1 in total).
+    """
+    mask = kmerMask(k)
+    code = 0
+    filled = 0
+    try:
+        for base in text:
+            code = ((code << 2) | _nucleo_code[base]) & mask
+            if filled < k - 1:
+                filled += 1
+                continue
+            yield code
+    except KeyError as error:
+        raise ValueError(f'Invalid nucleotide {error.args[0]!r} in text.') from None
+
+
+def reverseComplementCodes(codes, k):
+    """
+    :param codes: uint64 array of k-mer codes.
+    :param k: Integer for k-mer size, at most 32.
+    :return: uint64 array of the reverse complement codes, in the same order. With A=0, C=1, G=2, T=3
+             complementing is XOR 3.
+    """
+    codes = codes ^ np.uint64(kmerMask(k))
+    result = np.zeros_like(codes)
+    for i in range(k):
+        result = (result << np.uint64(2)) | (codes & np.uint64(3))
+        codes = codes >> np.uint64(2)
+    return result
+
+
+def codeDistance(a, b, k):
+    """
+    Hamming distance between two k-mer codes: XOR them, fold each 2-bit field onto its low bit and
+    count the set bits.
+
+    :param a: Integer code of first k-mer.
+    :param b: Integer code of second k-mer.
+    :param k: Integer for k-mer size.
+    :return: Integer number of mismatching bases.
+    """
+    x = a ^ b
+    return ((x | (x >> 1)) & (kmerMask(k) // 3)).bit_count()
+
+
+def decodeCodes(codes, k):
+    """
+    Decodes many integer codes at once.
+
+    :param codes: Iterable of integer k-mer codes.
+    :param k: Integer for k-mer size.
+    :return: List of k-mer strings in the same order as codes.
+    """
+    return [codeToPattern(code, k) for code in codes]
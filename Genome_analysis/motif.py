@@ -1,10 +1,25 @@
-from Week_2.skew import hammingDistance, neighbors
-from Week_1.count_substring import numberToPattern
+from skew import hammingDistance
+from kmerEncoding import rollingCodes, decodeCodes, codeToPattern, patternToCode, codeDistance
+from neighborhood import maskArray
+from checkpoint import checkpointKey, saveCheckpoint, loadCheckpoint
 from collections import Counter
+from multiprocessing import Pool, Value
 import itertools
 import timeit
 import math
 from functools import reduce
+import numpy as np
+from motifMatrix import encodeArray, countMatrix, countLists, profileMatrix, profileDict, scoreCounts, \
+    consensusCounts, entropyCounts, logProfile, scanProfile, addRow
+
+# Largest k for which motifEnumeration uses a dense 4^k membership bitmap.
+_dense_motif_k = 13
+
+# Best distance found by any worker of the current medianString pool.
+_shared_best = None
+
+# Number of subtrees branchMedianString splits the search into when checkpointing in one process.
+_checkpoint_subtrees = 64
 
 
 def window(seq, k):
@@ -12,88 +27,82 @@ def window(seq, k):
         yield seq[i:i + k]
 
 
-def motifEnumeration(DNA, k, d):
-    patterns = set()
-    temp_motifs = []
-    for i in DNA:
-        for j in range(len(i)-k):
-            temp_patt = i[j:j+k]
-            neigh = neighbors(temp_patt, d)
-            temp_motifs.append(neigh)
+def motifNeighborhood(string, k, d):
+    """
+    :param string: Single DNA string.
+    :param k: Integer for k-mer size, at most 32.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Sorted uint64 array of the codes of every k-mer within distance d of some window of string.
+    """
+    codes = np.unique(np.fromiter(rollingCodes(string, k), dtype=np.uint64))
+    return np.unique((codes[:, None] ^ maskArray(k, d)[None, :]).ravel())
 
-    for i in temp_motifs:
-        for combo in i:
-            if all(any(hammingDistance(combo, pat) <= d for pat in window(string, k)) for string in DNA):
-                patterns.add(combo)
 
-    return list(patterns)
+def motifEnumeration(DNA, k, d, checkpoint=None):
+    """
+    Finds every (k, d)-motif: the k-mers that appear with at most d mismatches in every string of DNA.
+    The answer is the intersection of the per-string neighborhood sets. Strings with the fewest distinct
+    windows (the smallest sets) are intersected first, and the search stops as soon as it is empty.
+    With a checkpoint file, the candidates left are saved after every string and an existing checkpoint
+    is resumed from the next string.
+
+    :param DNA: List of DNA strings.
+    :param k: Integer for k-mer size, at most 32.
+    :param d: Integer for the maximum number of mismatches.
+    :param checkpoint: string with file name of the checkpoint, None to keep no checkpoint.
+    :return: Sorted list of motif strings.
+    """
+    if not DNA:
+        return []
+    order = sorted(DNA, key=lambda string: len(set(window(string, k))))
+    key = checkpointKey('motifEnumeration', DNA, k, d)
+    state = loadCheckpoint(checkpoint, key) if checkpoint else None
+    if state is None:
+        state = {'key': key, 'done': 1, 'result': motifNeighborhood(order[0], k, d)}
+    result = state['result']
+
+    for i in range(state['done'], len(order)):
+        string = order[i]
+        if not len(result):
+            return []
+        if k <= _dense_motif_k:
+            # Mark the string's neighborhood in a 4^k bitmap and keep the candidates that are marked.
+            codes = np.unique(np.fromiter(rollingCodes(string, k), dtype=np.uint64))
+            member = np.zeros(4 ** k, dtype=bool)
+            member[(codes[:, None] ^ maskArray(k, d)[None, :]).ravel()] = True
+            result = result[member[result]]
+        else:
+            result = np.intersect1d(result, motifNeighborhood(string, k, d), assume_unique=True)
+        if checkpoint:
+            state['done'] = i + 1
+            state['result'] = result
+            saveCheckpoint(state, checkpoint)
+
+    return decodeCodes(result.tolist(), k)
 
 
 def countMotif(motifs):
-    result = []
-    for i in range(len(motifs[0])):
-        column = [row[i] for row in motifs]
-        a_count = column.count("A")
-        c_count = column.count("C")
-        g_count = column.count("G")
-        t_count = column.count("T")
-
-        column_counts = [a_count, c_count, g_count, t_count]
-        result.append(column_counts)
-    return result
+    return countLists(countMatrix(motifs))
 
 
 def countMotifPseudo(motifs):
-    result = []
-    for i in range(len(motifs[0])):
-        column = [row[i] for row in motifs]
-        a_count = column.count("A")
-        c_count = column.count("C")
-        g_count = column.count("G")
-        t_count = column.count("T")
-
-        column_counts = [a_count + 1, c_count + 1, g_count + 1, t_count + 1]
-        result.append(column_counts)
-    return result
+    return countLists(countMatrix(motifs), pseudo=1)
 
 
 def scoreMotif(motifs):
-    counts = countMotif(motifs)
-    result = [sum(i)-max(i) for i in counts]
-    return sum(result)
+    return scoreCounts(countMatrix(motifs))
 
 
 def consensus(motifs):
-    result = []
-    for i in range(len(motifs[0])):
-        column = [row[i] for row in motifs]
-        column_con = max(column, key=column.count)
-        result.append(column_con)
-    return "".join(result)
+    return consensusCounts(countMatrix(motifs))
 
 
 def profile(motifs):
-    counts = countMotif(motifs)
-    result = {'A': [], 'C': [], 'G': [], 'T': []}
-    for column in counts:
-        percent = [element / sum(column) for element in column]
-        result['A'].append(percent[0])
-        result['C'].append(percent[1])
-        result['G'].append(percent[2])
-        result['T'].append(percent[3])
-    return result
+    return profileDict(profileMatrix(countMatrix(motifs)))
 
 
 def profilePseudo(motifs):
-    counts = countMotifPseudo(motifs)
-    result = {'A': [], 'C': [], 'G': [], 'T': []}
-    for column in counts:
-        percent = [element / sum(column) for element in column]
-        result['A'].append(percent[0])
-        result['C'].append(percent[1])
-        result['G'].append(percent[2])
-        result['T'].append(percent[3])
-    return result
+    return profileDict(profileMatrix(countMatrix(motifs), pseudo=1))
 
 
 def fastScoreMotif(DNA):
@@ -113,40 +122,127 @@ def entropy(lst):
 
 
 def motifEntropy(motifs):
-    prof = profile(motifs)
-    result = []
-    for i, j, k, d in zip(prof['A'], prof['C'], prof['G'], prof['T']):
-        result.append(entropy([i, j, k, d]))
-    return abs(sum(result))
+    return entropyCounts(countMatrix(motifs))
 
 
 def patStringDistance(Pattern, DNA):
+    # Windows are compared as 2-bit codes with XOR/popcount instead of character by character.
     k = len(Pattern)
+    code = patternToCode(Pattern)
     distance = 0
     for i in DNA:
-        hd = len(i)
+        distance += min((codeDistance(code, kmer, k) for kmer in rollingCodes(i, k)), default=len(i))
 
-        for j in range(len(i)-k+1):
-            kmer = i[j:j+k]
-            temp_hd = hammingDistance(Pattern, kmer)
-            if temp_hd < hd:
-                hd = temp_hd
+    return distance
 
-        distance += hd
 
-    return distance
+def _windowMatrix(string, k):
+    # Every k-mer window of string as a row of base indices.
+    return np.lib.stride_tricks.sliding_window_view(encodeArray(string), k)
 
 
-def medianString(DNA, k):
-    distance = k * len(DNA)
-    for i in range(int(math.pow(4, k))):
-        pattern = numberToPattern(i, k)
-        if distance > patStringDistance(pattern, DNA):
-            distance = patStringDistance(pattern, DNA)
+def _initShared(best):
+    global _shared_best
+    _shared_best = best
 
-            median = pattern
 
-    return median
+def _medianSubtree(args):
+    """
+    Branch and bound over every pattern starting with prefix. The distance of a prefix to a string is
+    the minimum over windows of the mismatches in its first len(prefix) columns; it can only grow as the
+    prefix is extended, so a subtree is pruned once it reaches the best distance found.
+    """
+    prefix, windows, k, bound = args
+    best = [bound, None]
+
+    def search(depth, dists, code):
+        total = sum(int(dist.min()) for dist in dists)
+        if total >= best[0]:
+            return
+        # Other workers may already hold a better pattern. Equal ones are kept for the lexicographic tie-break.
+        if _shared_best is not None and total > _shared_best.value:
+            return
+        if depth == k:
+            best[0], best[1] = total, code
+            if _shared_best is not None:
+                with _shared_best.get_lock():
+                    if total < _shared_best.value:
+                        _shared_best.value = total
+            return
+        for base in range(4):
+            search(depth + 1, [dist + (window[:, depth] != base) for dist, window in zip(dists, windows)],
+                   (code << 2) | base)
+
+    dists = [np.zeros(len(window), dtype=np.int32) for window in windows]
+    code = 0
+    for depth, base in enumerate(prefix):
+        dists = [dist + (window[:, depth] != base) for dist, window in zip(dists, windows)]
+        code = (code << 2) | base
+    search(len(prefix), dists, code)
+    return best[0], best[1]
+
+
+def branchMedianString(DNA, k, processes=None, checkpoint=None):
+    """
+    Median string by branch and bound over the prefix tree of candidate patterns. Per-window distances
+    are kept for each prefix and extended one column at a time, and subtrees whose partial distance
+    already reaches the best distance are skipped. With processes, the top levels of the tree are split
+    across a process pool sharing the best distance found so far. With a checkpoint file, the number of
+    finished subtrees and the best pattern so far are saved as subtrees finish, in order, and an existing
+    checkpoint is resumed from the first unfinished subtree.
+
+    :param DNA: List of DNA strings.
+    :param k: Integer for k-mer size.
+    :param processes: Integer number of worker processes, default runs in this process.
+    :param checkpoint: string with file name of the checkpoint, None to keep no checkpoint.
+    :return: String of the lexicographically first pattern with minimal distance to DNA.
+    """
+    # A string shorter than k has no window and adds len(string) to every pattern's distance, as in
+    # patStringDistance, so it cannot change the median and is left out of the search.
+    windows = [_windowMatrix(string, k) for string in DNA if len(string) >= k]
+    bound = k * len(DNA) + 1
+    parallel = processes and processes > 1
+
+    if not parallel and not checkpoint:
+        distance, code = _medianSubtree(((), windows, k, bound))
+        return codeToPattern(code, k)
+
+    key = checkpointKey('branchMedianString', DNA, k)
+    state = loadCheckpoint(checkpoint, key) if checkpoint else None
+    if state is None:
+        # Enough subtrees to keep every worker busy, or to lose little work when resuming.
+        depth = 0
+        while 4 ** depth < (4 * processes if parallel else _checkpoint_subtrees) and depth < k:
+            depth += 1
+        state = {'key': key, 'depth': depth, 'done': 0, 'best': (bound, None)}
+    # A resumed search keeps the split it was started with.
+    prefixes = list(itertools.product(range(4), repeat=state['depth']))
+
+    def finish(result):
+        # Subtrees finish in prefix order, so keeping the smallest (distance, code) keeps the first tie.
+        if result[1] is not None and result < state['best']:
+            state['best'] = result
+        state['done'] += 1
+        if checkpoint:
+            saveCheckpoint(state, checkpoint)
+
+    remaining = prefixes[state['done']:]
+    if parallel:
+        best = Value('i', state['best'][0])
+        with Pool(processes, initializer=_initShared, initargs=(best,)) as pool:
+            for result in pool.imap(_medianSubtree, [(prefix, windows, k, bound) for prefix in remaining]):
+                finish(result)
+    else:
+        for prefix in remaining:
+            # Later subtrees only need to beat the best distance so far to change the answer.
+            finish(_medianSubtree((prefix, windows, k, state['best'][0])))
+
+    distance, code = state['best']
+    return codeToPattern(code, k)
+
+
+def medianString(DNA, k, processes=None, checkpoint=None):
+    return branchMedianString(DNA, k, processes, checkpoint)
 
 
 def computeProfile(consensus, profile):
@@ -164,8 +260,7 @@ def computeProfile(consensus, profile):
 
 def profileMostProbable(string, k, profile):
     """
-    Function utilises computeProfile to determine probability of all k-mers of string
-    and return the most probable k-mer.
+    Function scores all k-mers of string against the log of the profile and returns the most probable k-mer.
 
     :param string: Takes in genome data as single string.
     :param k: integer for k-mer size.
@@ -173,39 +268,74 @@ def profileMostProbable(string, k, profile):
     :return: String of most probable k-mer.
     """
 
-    result = {}
-    for i in range(len(string) - k + 1):
-        kmer = string[i:i+k]
-        prob = computeProfile(kmer, profile)
-        result[kmer] = prob
-    return max(result, key=result.get)
+    # All windows are scored at once in log space, which also avoids underflow for long motifs.
+    index, scores = scanProfile(string, logProfile(profile))
+    return string[index:index + k]
 
 
-def greedyMotif(DNA, k, t):
+def _greedyStarts(args):
+    """
+    Runs greedy motif search from each starting k-mer of DNA[0] in starts. The count matrix is updated
+    in O(k) as each motif is appended instead of rebuilding the profile from the motif list.
+
+    :return: Tuple of (score, start, motif positions) of the best start, None if starts is empty.
+    """
+    starts, encoded, k, pseudo = args
+    best = None
+    for i in starts:
+        counts = np.zeros((4, k), dtype=np.int64)
+        addRow(counts, encoded[0][i:i + k])
+        positions = [i]
+        for string in encoded[1:]:
+            index, scores = scanProfile(string, logProfile(profileMatrix(counts, pseudo)))
+            addRow(counts, string[index:index + k])
+            positions.append(index)
+
+        score = scoreCounts(counts)
+        if best is None or score < best[0]:
+            best = (score, i, positions)
+    return best
+
+
+def greedyMotifSearch(DNA, k, t, pseudo=False, processes=None):
+    """
+    Greedy motif search with incremental count matrices. Every starting k-mer of DNA[0] is independent,
+    so with processes the starting positions are split into contiguous blocks across a process pool and
+    the best-scoring motif set is kept, earliest start first on ties.
+
+    :param DNA: List of DNA strings.
+    :param k: Integer for k-mer size.
+    :param t: Integer for the number of strings to use.
+    :param pseudo: If True, profiles use pseudocounts of 1.
+    :param processes: Integer number of worker processes, default runs in this process.
+    :return: List of best motif strings.
+    """
     bestMotifs = [string[:k] for string in DNA]
-    for i in range(len(DNA[0])-k+1):
-        first = DNA[0]
-        motif = [first[i:i + k]]
-        for string in DNA[1:t]:
-            motif_profile = profile(motif)
-            result = profileMostProbable(string, k, motif_profile)
-            motif.append(result)
-
-        if scoreMotif(motif) < scoreMotif(bestMotifs):
-            bestMotifs = motif
+    encoded = [encodeArray(string) for string in DNA[:t]]
+    starts = range(len(DNA[0]) - k + 1)
+    pseudo = 1 if pseudo else 0
+
+    if not processes or processes == 1:
+        results = [_greedyStarts((starts, encoded, k, pseudo))]
+    else:
+        step = -(-len(starts) // processes)
+        blocks = [starts[i:i + step] for i in range(0, len(starts), step)]
+        with Pool(processes) as pool:
+            results = pool.map(_greedyStarts, [(block, encoded, k, pseudo) for block in blocks])
+
+    results = [result for result in results if result is not None]
+    if not results:
+        return bestMotifs
+    score, start, positions = min(results, key=lambda result: (result[0], result[1]))
+
+    if score < scoreMotif(bestMotifs):
+        bestMotifs = [string[i:i + k] for string, i in zip(DNA, positions)]
     return bestMotifs
 
 
-def greedyMotifPseudo(DNA, k, t):
-    bestMotifs = [string[:k] for string in DNA]
-    for i in range(len(DNA[0])-k+1):
-        first = DNA[0]
-        motif = [first[i:i + k]]
-        for string in DNA[1:t]:
-            motif_profile = profilePseudo(motif)
-            result = profileMostProbable(string, k, motif_profile)
-            motif.append(result)
-
-        if scoreMotif(motif) < scoreMotif(bestMotifs):
-            bestMotifs = motif
-    return bestMotifs
+def greedyMotif(DNA, k, t, processes=None):
+    return greedyMotifSearch(DNA, k, t, processes=processes)
+
+
+def greedyMotifPseudo(DNA, k, t, processes=None):
+    return greedyMotifSearch(DNA, k, t, pseudo=True, processes=processes)
@@ -0,0 +1,156 @@
+import numpy as np
+from kmerEncoding import encodeArray
+
+_nucleo = 'ACGT'
+
+# Relative tolerance under which two log scores count as the same probability.
+_tie_tolerance = 1e-12
+
+
+def motifArray(motifs):
+    """
+    :param motifs: List of t motif strings of equal length k.
+    :return: t x k uint8 array of base indices.
+    """
+    if not motifs:
+        return np.zeros((0, 0), dtype=np.uint8)
+    return encodeArray(''.join(motifs)).reshape(len(motifs), len(motifs[0]))
+
+
+def countMatrix(motifs):
+    """
+    :param motifs: List of motif strings or a t x k array from motifArray.
+    :return: 4 x k int64 array, row i holding the count of base i ('ACGT'[i]) in each column.
+    """
+    if not isinstance(motifs, np.ndarray):
+        motifs = motifArray(motifs)
+    t, k = motifs.shape
+    # Index base * k + column, so one bincount covers the whole matrix (row 4 collects other characters).
+    counts = np.bincount((motifs.astype(np.int64) * k + np.arange(k)).ravel(), minlength=5 * k)
+    return counts.reshape(5, k)[:4].copy()
+
+
+def addRow(counts, row):
+    """
+    Adds one motif to a count matrix in place, O(k).
+
+    :param counts: 4 x k count matrix.
+    :param row: Motif string or uint8 array of base indices.
+    """
+    if isinstance(row, str):
+        row = encodeArray(row)
+    counts[row, np.arange(len(row))] += 1
+
+
+def removeRow(counts, row):
+    """
+    Removes one motif from a count matrix in place, O(k).
+
+    :param counts: 4 x k count matrix.
+    :param row: Motif string or uint8 array of base indices.
+    """
+    if isinstance(row, str):
+        row = encodeArray(row)
+    counts[row, np.arange(len(row))] -= 1
+
+
+def profileMatrix(counts, pseudo=0):
+    """
+    :param counts: 4 x k count matrix.
+    :param pseudo: Pseudocount added to every cell.
+    :return: 4 x k float array of column probabilities.
+    """
+    counts = counts + pseudo
+    return counts / counts.sum(axis=0)
+
+
+def scoreCounts(counts):
+    """
+    :param counts: 4 x k count matrix.
+    :return: Integer number of bases differing from the most common base of their column.
+    """
+    return int((counts.sum(axis=0) - counts.max(axis=0)).sum())
+
+
+def consensusCounts(counts):
+    """
+    :param counts: 4 x k count matrix.
+    :return: String of the most common base of each column, ties going to the first of A, C, G, T.
+    """
+    return ''.join(_nucleo[i] for i in counts.argmax(axis=0))
+
+
+def entropyCounts(counts):
+    """
+    :param counts: 4 x k count matrix.
+    :return: Float total entropy (in bits) of the column distributions.
+    """
+    prof = profileMatrix(counts)
+    logs = np.log2(prof, out=np.zeros_like(prof), where=prof > 0)
+    return float(abs((prof * logs).sum()))
+
+
+def countLists(counts, pseudo=0):
+    """
+    :param counts: 4 x k count matrix.
+    :param pseudo: Pseudocount added to every cell.
+    :return: List of [A, C, G, T] counts per column.
+    """
+    return (counts + pseudo).T.tolist()
+
+
+def profileDict(prof):
+    """
+    :param prof: 4 x k profile matrix.
+    :return: Dictionary of nucleotide -> list of probabilities per column.
+    """
+    return {base: prof[i].tolist() for i, base in enumerate(_nucleo)}
+
+
+def logProfile(prof):
+    """
+    :param prof: Profile as a dictionary of nucleotide -> list of probabilities, or a 4 x k matrix.
+    :return: 5 x k array of log probabilities. Row 4 (non-ACGT characters) and zero probabilities are -inf.
+    """
+    if isinstance(prof, dict):
+        prof = np.array([prof[base] for base in _nucleo], dtype=np.float64)
+    result = np.full((5, prof.shape[1]), -np.inf)
+    np.log(prof, out=result[:4], where=prof > 0)
+    return result
+
+
+def scoreWindows(seq, logProf):
+    """
+    Scores every window of seq against a log profile. Column by column, the log probability of each
+    window's base is gathered for all windows at once and added to a running sum.
+
+    :param seq: String of nucleotides or uint8 array from encodeArray.
+    :param logProf: 5 x k array from logProfile.
+    :return: Float array with the log probability of each of the len(seq) - k + 1 windows.
+    """
+    if isinstance(seq, str):
+        seq = encodeArray(seq)
+    k = logProf.shape[1]
+    windows = len(seq) - k + 1
+    if windows <= 0:
+        return np.empty(0)
+
+    scores = np.zeros(windows)
+    for j in range(k):
+        scores += logProf[seq[j:j + windows], j]
+    return scores
+
+
+def scanProfile(seq, logProf):
+    """
+    :param seq: String of nucleotides or uint8 array from encodeArray.
+    :param logProf: 5 x k array from logProfile.
+    :return: Tuple of (index of the most probable window, full score array).
+    """
+    scores = scoreWindows(seq, logProf)
+    if not len(scores):
+        raise ValueError('Sequence is shorter than the profile.')
+    # Equal probabilities can differ in the last bit once summed as logs, keep the first of such ties.
+    best = scores.max()
+    index = np.flatnonzero(scores >= best - _tie_tolerance * max(1.0, abs(best)))[0]
+    return int(index), scores
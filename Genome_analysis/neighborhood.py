@@ -0,0 +1,128 @@
+import itertools
+from functools import lru_cache
+import numpy as np
+from kmerEncoding import patternToCode, decodeCodes
+
+
+@lru_cache(maxsize=None)
+def mismatchMasks(k, d):
+    """
+    Builds the XOR masks that turn a k-mer code into each of its d-neighbors. A mask has at most d
+    non-zero 2-bit fields and XOR with 1, 2 or 3 changes a base into each of the other three bases,
+    so code ^ mask visits every neighbor exactly once.
+
+    :param k: Integer for k-mer size.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Tuple of integer masks, starting with 0 (the k-mer itself).
+    """
+    masks = [0]
+    for r in range(1, min(d, k) + 1):
+        for positions in itertools.combinations(range(k), r):
+            for subs in itertools.product((1, 2, 3), repeat=r):
+                mask = 0
+                for position, sub in zip(positions, subs):
+                    mask |= sub << (2 * position)
+                masks.append(mask)
+    return tuple(masks)
+
+
+@lru_cache(maxsize=None)
+def maskArray(k, d):
+    """
+    :param k: Integer for k-mer size, at most 32.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Read-only uint64 array of mismatchMasks(k, d).
+    """
+    result = np.array(mismatchMasks(k, d), dtype=np.uint64)
+    result.flags.writeable = False
+    return result
+
+
+def iterNeighborCodes(code, k, d):
+    """
+    :param code: Integer code of k-mer.
+    :param k: Integer for k-mer size.
+    :param d: Integer for the maximum number of mismatches.
+    :return: Generator of the integer codes of all k-mers within Hamming distance d, each once.
+    """
+    for mask in mismatchMasks(k, d):
+        yield code ^ mask
+
+
+def neighborCodes(code, k, d):
+    """
+    :param code: Integer code of k-mer.
+    :param k: Integer for k-mer size, at most 32.
+    :param d: Integer for the maximum number of mismatches.
+    :return: uint64 array of the codes of all k-mers within Hamming distance d.
+    """
+    return np.uint64(code) ^ maskArray(k, d)
+
+
+@lru_cache(maxsize=1 << 16)
+def cachedNeighborhood(code, k, d):
+    """
+    Memoized neighborCodes for callers that look up the same k-mers over and over.
+
+    :return: Read-only uint64 array of neighbor codes.
+    """
+    result = neighborCodes(code, k, d)
+    result.flags.writeable = False
+    return result
+
+
+def neighborhoodCounts(codes, k, d, dense=None):
+    """
+    Adds every code's d-neighborhood into one count table: each distinct code contributes its
+    multiplicity to code ^ mask for every mismatch mask. The dense table is filled one mismatch position
+    at a time instead of mask by mask.
+
+    :param codes: uint64 array of k-mer codes, repeats allowed.
+    :param k: Integer for k-mer size, at most 32.
+    :param d: Integer for the maximum number of mismatches.
+    :param dense: True for a 4^k array, False for sparse arrays. Default picks dense up to k = 13.
+    :return: Tuple of (codes, counts) arrays covering every k-mer with a non-zero count.
+    """
+    uniq, mult = np.unique(codes, return_counts=True)
+    masks = maskArray(k, d)
+    if dense is None:
+        dense = k <= 13
+
+    if dense:
+        # levels[e][c] counts windows at exactly e mismatches from c. Mismatch positions are added one
+        # at a time, highest e first, so no position is used twice. Summing over the 4 bases of position p
+        # and subtracting the base itself gives the 3 substitutions there in one vectorized step.
+        freq = np.zeros(4 ** k, dtype=np.int32)
+        freq[uniq] = mult
+        levels = [freq] + [np.zeros_like(freq) for e in range(min(d, k))]
+        for position in range(k):
+            for e in range(min(d, position + 1), 0, -1):
+                source = levels[e - 1].reshape(-1, 4, 4 ** position)
+                levels[e] += (source.sum(axis=1, keepdims=True, dtype=np.int32) - source).reshape(-1)
+        total = levels[0].astype(np.int64)
+        for level in levels[1:]:
+            total += level
+        hits = np.flatnonzero(total)
+        return hits.astype(np.uint64), total[hits]
+
+    result_codes = np.empty(0, dtype=np.uint64)
+    result_counts = np.empty(0, dtype=np.int64)
+    # Merge a block of masks at a time to keep the temporary arrays bounded.
+    for start in range(0, len(masks), 64):
+        block = (uniq[:, None] ^ masks[None, start:start + 64]).ravel()
+        weights = np.repeat(mult, len(masks[start:start + 64]))
+        merged, inverse = np.unique(np.concatenate([result_codes, block]), return_inverse=True)
+        result_counts = np.bincount(inverse, np.concatenate([result_counts, weights]),
+                                    minlength=len(merged)).astype(np.int64)
+        result_codes = merged
+    return result_codes, result_counts
+
+
+def neighborPatterns(pattern, d):
+    """
+    :param pattern: String of nucleotides.
+    :param d: Integer for the maximum number of mismatches.
+    :return: List of all strings within Hamming distance d of pattern, pattern itself first.
+    """
+    k = len(pattern)
+    return decodeCodes(iterNeighborCodes(patternToCode(pattern), k, d), k)
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+from fastaReader import streamFasta
+from motifMatrix import encodeArray, logProfile, scoreWindows
+
+# Row order of the reverse complement matrix: A<->T, C<->G, other characters stay last.
+_complement_rows = [3, 2, 1, 0, 4]
+
+
+def logOddsMatrix(profile, background=0.25):
+    """
+    Converts a profile into a position weight matrix of log-odds scores against a background.
+
+    :param profile: Dictionary of nucleotide -> list of probabilities (as produced by profile()).
+    :param background: Float background probability of every base, or dictionary of nucleotide -> float.
+    :return: 5 x k array of natural log-odds, row 4 (non-ACGT characters) being -inf.
+    """
+    matrix = logProfile(profile)
+    if isinstance(background, dict):
+        matrix[:4] -= np.log([[background[base]] for base in 'ACGT'])
+    else:
+        matrix[:4] -= math.log(background)
+    return matrix
+
+
+def reverseComplementMatrix(matrix):
+    """
+    :param matrix: 5 x k log-odds matrix.
+    :return: Matrix scoring the reverse strand when slid along the forward sequence.
+    """
+    return matrix[_complement_rows, ::-1]
+
+
+def scanChunks(chunks, pwms, threshold, strands='both'):
+    """
+    Scans chunked sequence with many PWMs in one pass. The last k - 1 bases of each chunk are carried
+    into the next one so windows crossing chunk boundaries are scored exactly once.
+
+    :param chunks: Iterable of (header, chunk) tuples as produced by fastaReader.streamFasta.
+    :param pwms: Dictionary of name -> 5 x k log-odds matrix from logOddsMatrix.
+    :param threshold: Float minimum score, or dictionary of name -> float.
+    :param strands: '+', '-' or 'both'.
+    :return: Generator of (header, name, position, strand, score) tuples. Position is the 0-based start of
+             the window on the forward strand of the record.
+    """
+    if not pwms:
+        return
+    matrices = []
+    for name, matrix in pwms.items():
+        limit = threshold[name] if isinstance(threshold, dict) else threshold
+        if strands in ['+', 'both']:
+            matrices.append((name, '+', matrix, limit))
+        if strands in ['-', 'both']:
+            matrices.append((name, '-', reverseComplementMatrix(matrix), limit))
+    overlap = max(matrix.shape[1] for matrix in pwms.values()) - 1
+
+    record = object()
+    for header, chunk in chunks:
+        if header != record:
+            record = header
+            carry = np.empty(0, dtype=np.uint8)
+            offset = 0
+
+        seq = np.concatenate([carry, encodeArray(chunk)])
+        for name, strand, matrix, limit in matrices:
+            scores = scoreWindows(seq, matrix)
+            # Windows lying entirely in the carried bases were reported with the previous chunk.
+            first = max(len(carry) - matrix.shape[1] + 1, 0)
+            for i in np.flatnonzero(scores[first:] >= limit) + first:
+                yield header, name, offset + int(i), strand, float(scores[i])
+
+        keep = min(overlap, len(seq))
+        offset += len(seq) - keep
+        carry = seq[len(seq) - keep:]
+
+
+def scanFasta(file, pwms, threshold, strands='both', chunkSize=1 << 20):
+    """
+    Scans a whole FASTA genome, record by record, without loading it into memory.
+
+    :param file: string with file name of FASTA genome.
+    :param pwms: Dictionary of name -> 5 x k log-odds matrix from logOddsMatrix.
+    :param threshold: Float minimum score, or dictionary of name -> float.
+    :param strands: '+', '-' or 'both'.
+    :param chunkSize: Integer, approximate number of bases read per chunk.
+    :return: Generator of (header, name, position, strand, score) tuples.
+    """
+    return scanChunks(streamFasta(file, chunkSize), pwms, threshold, strands)
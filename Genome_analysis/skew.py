@@ -1,6 +1,19 @@
+import numpy as np
+from approxMatch import approxPositions, approxCounts, seedPositions
+from neighborhood import neighborPatterns, neighborhoodCounts
+from kmerEncoding import rollingCodes, decodeCodes, reverseComplementCodes
 
+# Shortest pigeonhole piece worth seeding with an exact search, shorter pieces use the bit-parallel scan.
+_min_seed = 5
+
+_skew_step = np.zeros(256, dtype=np.int8)
+_skew_step[[ord('G'), ord('g')]] = 1
+_skew_step[[ord('C'), ord('c')]] = -1
+
+def skew(genome, mode=None):
+    if mode in ['array']:
+        return skewArray(genome)
 
-def skew(genome):
     genome = str(genome).upper()
     skewcount = 0
     skewlist = [0]
@@ -15,20 +28,98 @@ def skew(genome):
     return " ".join(map(str, skewlist))
 
 
-def minSkew(genome):
-    # reconvert string to list of int
-    temp_list = skew(genome)
-    temp_list = [int(x) for x in temp_list.split(' ')]
-
-    result = []
-    min_value = min(temp_list)
+def minSkew(genome, mode=None):
+    # Positions are taken straight from the skew array, no round trip through text.
+    temp_list = skewArray(genome)
+    result = np.flatnonzero(temp_list == temp_list.min())
 
-    for i in range(len(temp_list)):
-        if temp_list[i] == min_value:
-            result.append(i)
+    if mode in ['array']:
+        return result
 
     # returns list in string format, separated by spaces
-    return " ".join(map(str, result))
+    return " ".join(map(str, result.tolist()))
+
+
+def maxSkew(genome, mode=None):
+    temp_list = skewArray(genome)
+    result = np.flatnonzero(temp_list == temp_list.max())
+
+    if mode in ['array']:
+        return result
+
+    return " ".join(map(str, result.tolist()))
+
+
+def _skewSteps(chunk):
+    # Byte view of the sequence, each byte mapped to its -1/0/+1 skew step.
+    if isinstance(chunk, str):
+        chunk = chunk.encode('ascii', 'replace')
+    return _skew_step[np.frombuffer(chunk, dtype=np.uint8)]
+
+
+def skewArray(genome, start=0):
+    """
+    Computes the cumulative G - C skew with NumPy.
+
+    :param genome: String (or bytes) of genome data.
+    :param start: Integer skew value before the first base.
+    :return: Integer array of length len(genome) + 1, element i being the skew of the first i bases.
+    """
+    steps = _skewSteps(genome)
+    result = np.empty(len(steps) + 1, dtype=np.int64)
+    result[0] = start
+    np.cumsum(steps, out=result[1:])
+    result[1:] += start
+    return result
+
+
+def streamSkew(chunks):
+    """
+    Computes the skew of a genome given in chunks, carrying the running value from one chunk to the next.
+
+    :param chunks: Iterable of strings, e.g. (chunk for header, chunk in streamFasta(file)).
+    :return: Generator of integer arrays holding the skew after each base of the chunk.
+    """
+    current = 0
+    for chunk in chunks:
+        values = skewArray(chunk, current)[1:]
+        if len(values):
+            current = int(values[-1])
+        yield values
+
+
+def streamMinMaxSkew(chunks):
+    """
+    Finds the positions of minimum and maximum skew without holding the whole genome or skew array.
+
+    :param chunks: Iterable of strings that together make up the genome.
+    :return: Tuple of (min value, min positions, max value, max positions), positions as lists of ints
+             using the same indexing as skewArray.
+    """
+    min_value = max_value = 0
+    min_pos = [0]
+    max_pos = [0]
+    offset = 1
+
+    for values in streamSkew(chunks):
+        if not len(values):
+            continue
+        low = int(values.min())
+        high = int(values.max())
+
+        if low < min_value:
+            min_value, min_pos = low, []
+        if low == min_value:
+            min_pos.extend((np.flatnonzero(values == low) + offset).tolist())
+
+        if high > max_value:
+            max_value, max_pos = high, []
+        if high == max_value:
+            max_pos.extend((np.flatnonzero(values == high) + offset).tolist())
+
+        offset += len(values)
+
+    return min_value, min_pos, max_value, max_pos
 
 
 def hammingDistance(p, q):
@@ -47,53 +138,49 @@ def hammingDistance(p, q):
 
 
 def aproxPattPos(seq, patt, d):
-    position = []
-    for i in range(len(seq)-len(patt)+1):
-        temp = seq[i:i+len(patt)]
-        if hammingDistance(temp, patt) <= int(d):
-            position.append(i)
+    # Long patterns are seeded by exact search, otherwise bit-parallel scan (see approxMatch for many patterns).
+    if len(patt) // (int(d) + 1) >= _min_seed:
+        position = seedPositions(seq, patt, d)
+    else:
+        position = approxPositions(seq, [patt], d)[patt]
     position = " ".join(map(str, position))
     return position
 
 
 def aproxPattCount(seq, patt, d):
-    t_count = 0
-    for i in range(len(seq)-len(patt)+1):
-        temp = seq[i:i+len(patt)]
-        if hammingDistance(temp, patt) <= int(d):
-            t_count += 1
-    return t_count
+    if len(patt) // (int(d) + 1) >= _min_seed:
+        return len(seedPositions(seq, patt, d))
+    return approxCounts(seq, [patt], d)[patt]
 
 
 def immediateNeighbors(pattern):
-    neighborhood = []
-    for i in range(len(pattern)):
-        symbol = pattern[i]
-        for x in range(len(pattern)):
-            if x != symbol:
-                neighbor = symbol - x
-                neighborhood.append(neighbor)
-    return neighborhood
-            
+    # All strings at Hamming distance exactly 1, i.e. the 1-neighborhood without pattern itself.
+    return neighborPatterns(pattern, 1)[1:]
+
 
 def neighbors(pattern, d):
-    char = 'ACGT'
-    if d == 0:
-        return pattern
-    if len(pattern) == 1:
-        return ["A", "C", "G", "T"]
-
-    neighborhood = []
-    firstsymbol = pattern[:1]
-    suffix = pattern[1:]
-
-    suffixNeighbors = neighbors(suffix, d)
-
-    for text in suffixNeighbors:
-        if hammingDistance(text, suffix) < d:
-            for x in char:
-                neighborhood.append(x+text)
-        else:
-            neighborhood.append(firstsymbol+text)
-    return neighborhood
+    # Generated from 2-bit codes by choosing mismatch positions and substitutions, so each neighbor appears once.
+    return neighborPatterns(pattern, d)
+
+
+def frequentWordsMismatches(text, k, d, reverse=True):
+    """
+    Finds the most frequent k-mers with up to d mismatches, optionally counting reverse complements too.
+    Every window adds its d-neighborhood (and that of its reverse complement) into one count table.
+
+    :param text: String of genome data.
+    :param k: Integer for k-mer size, at most 32.
+    :param d: Integer for the maximum number of mismatches.
+    :param reverse: If True, occurrences on the reverse strand are counted as well.
+    :return: Sorted list of the most frequent k-mer strings.
+    """
+    codes = np.fromiter(rollingCodes(text, k), dtype=np.uint64)
+    if len(codes) == 0:
+        return []
+    if reverse:
+        codes = np.concatenate([codes, reverseComplementCodes(codes, k)])
+
+    hits, counts = neighborhoodCounts(codes, k, d)
+    best = hits[counts == counts.max()]
+    return decodeCodes(sorted(best.tolist()), k)
 